@@ -1,7 +1,15 @@
 import streamlit as st
+import json
+import os
 import time
-from research_agent import build_outline
-from slides_generator import create_presentation, THEME_STYLES
+from models import PresentationOutline
+from slides_generator import THEME_STYLES, presentation_id_from_link
+from pipeline import regenerate_slide
+from jobs import job_manager, ACTIVE_STATES
+from google_scheduler import scheduler as google_scheduler
+from model_router import hedge_stats
+
+POLL_INTERVAL = 1.0  # seconds between job status checks
 
 st.set_page_config(
     page_title="AI PPT Maker",
@@ -23,17 +31,41 @@ with st.sidebar:
         index=0,
     )
 
+    large_deck = st.toggle(
+        "📚 Large Deck Mode",
+        value=False,
+        help="Allow up to 100 slides; the outline is planned in sections that are written in parallel"
+    )
+
     num_slides = st.slider(
         "📄 Number of Slides",
         min_value=5,
-        max_value=15,
+        max_value=100 if large_deck else 15,
         value=8,
         step=1,
         help="How many content slides to generate (excluding title slide)"
     )
 
+    output_format = st.radio(
+        "📦 Output",
+        options=["Google Slides", "PowerPoint (.pptx)"],
+        help="PowerPoint files are rendered locally — no Google account needed"
+    )
+
     use_images = st.toggle("🖼️ Include Images", value=True)
 
+    draft_mode = st.toggle(
+        "⚡ Draft Mode",
+        value=False,
+        help="Use a faster, lighter model for a quick first pass"
+    )
+
+    reuse_research = st.toggle(
+        "♻️ Reuse Cached Research",
+        value=True,
+        help="Reuse the outline from an earlier run with the same topic and slide count (e.g. when only the theme changed)"
+    )
+
     image_url = st.text_input(
         "🖼️ Hero Image URL (optional)",
         placeholder="https://example.com/image.jpg",
@@ -60,65 +92,149 @@ topic = st.text_input(
 generate_btn = st.button("🚀 Generate Presentation", type="primary", use_container_width=True)
 
 # ── Generation ────────────────────────────────────────────────────────────────
+# Generations run on the background job pool; the script only submits and
+# polls, so refreshing the page or clicking again doesn't lose a deck in
+# progress. The job ID lives in the URL so a reconnect finds it again.
 if generate_btn:
     if not topic.strip():
         st.warning("⚠️ Please enter a topic first.")
     else:
-        # Phase 1 — Research
-        with st.status("🧠 Researching topic with AI...", expanded=True) as status:
-            try:
-                t1 = time.time()
-                outline = build_outline(topic.strip(), num_slides=num_slides)
-                t2 = time.time()
-                research_time = round(t2 - t1, 1)
-                status.update(
-                    label=f"✅ Research complete — {len(outline.slides)} slides planned ({research_time}s)",
-                    state="complete"
-                )
-            except Exception as e:
-                status.update(label="❌ Research failed", state="error")
-                st.error(f"Research error: {e}")
-                st.stop()
-
-        # Phase 2 — Slide Generation
-        with st.status("🎨 Generating slides...", expanded=True) as status:
-            try:
-                t3 = time.time()
-                link = create_presentation(
-                    outline,
-                    theme=theme,
-                    image_url=image_url,
-                    use_images=use_images,
-                )
-                t4 = time.time()
-                generation_time = round(t4 - t3, 1)
-                status.update(
-                    label=f"✅ Slides generated ({generation_time}s)",
-                    state="complete"
+        job_id = job_manager.submit({
+            "topic":      topic.strip(),
+            "num_slides": num_slides,
+            "theme":      theme,
+            "output":     "google" if output_format == "Google Slides" else "pptx",
+            "use_images": use_images,
+            "use_cache":  reuse_research,
+            "image_url":  image_url,
+            "draft":      draft_mode,
+        })
+        st.session_state.job_id = job_id
+        st.query_params["job"]  = job_id
+
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+job    = job_manager.get(job_id) if job_id else None
+
+if job_id and job is None:
+    st.warning("⚠️ That generation could not be found. It may have expired — please generate again.")
+    st.query_params.clear()
+    st.session_state.pop("job_id", None)
+
+elif job and job["status"] in ACTIVE_STATES:
+    if job["status"] == "queued":
+        label = "⏳ Waiting for a free worker..."
+    elif job["params"]["output"] == "pptx":
+        label = "🧠 Researching topic and rendering .pptx..."
+    else:
+        # Research and slide generation run as one pipeline: the deck is
+        # provisioned and images are fetched while the outline streams in.
+        label = "🧠 Researching topic and preparing slides..."
+    with st.status(label, expanded=True):
+        for message in job["progress"]:
+            st.write(message)
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
+
+elif job and job["status"] == "error":
+    st.error(f"Generation error: {job['error']}")
+
+elif job:
+    result     = job["result"]
+    outline    = PresentationOutline.model_validate(result["outline"])
+    timings    = result["timings"]
+    gen_trace  = result["trace"]
+    cache_note = ", cached research" if result["from_cache"] else ""
+
+    research_time   = timings["research"]
+    generation_time = round(timings["total"] - timings["research"], 1)
+
+    # ── Result ────────────────────────────────────────────────────────────────
+    verb = "rendered" if result["pptx_path"] else "generated"
+    st.success(f"🎉 Your presentation is ready! {len(outline.slides)} slides {verb} ({timings['total']}s{cache_note})")
+    if result["pptx_path"]:
+        if os.path.exists(result["pptx_path"]):
+            with open(result["pptx_path"], "rb") as f:
+                st.download_button(
+                    "⬇️ Download .pptx",
+                    data=f.read(),
+                    file_name=os.path.basename(result["pptx_path"]),
+                    mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                    type="primary",
                 )
-            except Exception as e:
-                status.update(label="❌ Slide generation failed", state="error")
-                st.error(f"Slide generation error: {e}")
-                st.stop()
-
-        # ── Result ────────────────────────────────────────────────────────────
-        st.success("🎉 Your presentation is ready!")
-        st.markdown(f"### 🔗 [Open in Google Slides]({link})")
-
-        col1, col2, col3 = st.columns(3)
-        col1.metric("📄 Slides",          len(outline.slides))
-        col2.metric("⏱️ Research Time",   f"{research_time}s")
-        col3.metric("⏱️ Generation Time", f"{generation_time}s")
-
-        st.markdown("---")
-        st.markdown("**Slide Outline:**")
-        for i, slide in enumerate(outline.slides, start=1):
-            with st.expander(f"Slide {i}: {slide.title}"):
-                if slide.table:
-                    st.markdown("📊 **Table Slide**")
-                    st.write(f"Headers: {slide.table.headers}")
-                else:
-                    for bullet in slide.bullets:
-                        st.markdown(f"• {bullet}")
-                if slide.notes:
-                    st.caption(f"📝 Notes: {slide.notes}")
+        else:
+            st.warning("⚠️ The .pptx file is no longer on the server — please generate again.")
+    else:
+        st.markdown(f"### 🔗 [Open in Google Slides]({result['link']})")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("📄 Slides",          len(outline.slides))
+    col2.metric("⏱️ Research Time",   f"{research_time}s")
+    col3.metric("⏱️ Generation Time", f"{generation_time}s")
+    col4.metric("⏱️ End-to-End",      f"{timings['total']}s")
+
+    with st.expander("🔍 Phase Breakdown"):
+        st.table([
+            {"Span": name, "Calls": entry["count"], "Total (s)": entry["total_s"], "Max (s)": entry["max_s"]}
+            for name, entry in gen_trace["summary"].items()
+        ])
+        queue = google_scheduler.metrics()
+        st.caption(
+            f"Google quota queue: {queue['calls']} calls, {queue['retries']} retries "
+            f"({queue['throttled']} throttled), avg wait {queue['avg_wait_s']}s, "
+            f"max wait {queue['max_wait_s']}s, peak depth {queue['max_queued']}"
+        )
+        hedges = hedge_stats.summary()
+        if hedges["requests"]:
+            st.caption(
+                f"Hedged outlines: {hedges['hedges_fired']} of {hedges['requests']} requests hedged, "
+                f"{hedges['hedge_wins']} won by the hedge, ~{hedges['saved_s']}s saved"
+            )
+        st.download_button(
+            "⬇️ Download trace (JSON)",
+            data=json.dumps(gen_trace["spans"], indent=2),
+            file_name=f"trace-{gen_trace['trace_id'][:8]}.json",
+            mime="application/json",
+        )
+
+    if result["link"]:
+        with st.expander("🔁 Regenerate a Slide"):
+            slide_index = st.selectbox(
+                "Slide",
+                options=range(1, len(outline.slides) + 1),
+                format_func=lambda i: f"Slide {i}: {outline.slides[i - 1].title}",
+            )
+            instructions = st.text_input(
+                "Instructions (optional)",
+                placeholder="e.g. Focus on real-world examples, or turn this into a comparison table",
+            )
+            if st.button("🔁 Regenerate Slide"):
+                params = job["params"]
+                try:
+                    with st.spinner(f"Rewriting slide {slide_index}..."):
+                        new_outline, changes = regenerate_slide(
+                            presentation_id_from_link(result["link"]),
+                            outline,
+                            slide_index,
+                            theme=params["theme"],
+                            use_images=params["use_images"],
+                            instructions=instructions,
+                            draft=params.get("draft", False),
+                        )
+                    job_manager.update_result(job["id"], outline=new_outline.model_dump())
+                    st.toast(f"✅ Slide {slide_index} updated: {', '.join(changes) or 'no changes'}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Regeneration error: {e}")
+
+    st.markdown("---")
+    st.markdown("**Slide Outline:**")
+    for i, slide in enumerate(outline.slides, start=1):
+        with st.expander(f"Slide {i}: {slide.title}"):
+            if slide.table:
+                st.markdown("📊 **Table Slide**")
+                st.write(f"Headers: {slide.table.headers}")
+            else:
+                for bullet in slide.bullets:
+                    st.markdown(f"• {bullet}")
+            if slide.notes:
+                st.caption(f"📝 Notes: {slide.notes}")
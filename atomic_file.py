@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+
+def write_atomic(path: str, text: str):
+    """Write `text` to `path` through a temp file in the same directory and
+    an os.replace, so readers never see a half-written file. The temp file
+    is removed if anything fails; the error is re-raised."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,217 @@
+"""Headless batch generation.
+
+Reads jobs from a CSV or JSONL file (columns: topic, and optionally id,
+num_slides, theme, use_images, image_url, draft) and writes one JSON line per
+finished deck to the results file. Jobs whose id already has an "ok" line
+in the results file are skipped, so an interrupted run can simply be
+started again with the same arguments.
+
+    python batch.py topics.csv --out results.jsonl --workers 8
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from image_search import find_image_url
+from research_agent import build_outline, limit_groq
+from slides_generator import create_presentation, THEME_STYLES
+from tracing import trace, submit
+from google_scheduler import scheduler as google_scheduler, as_user
+from model_router import hedge_stats
+
+DEFAULT_THEME = "Default (No Theme)"
+
+
+def _as_bool(value, default: bool = True) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "off")
+
+
+def load_jobs(path: str) -> list[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for row in rows:
+        topic = (row.get("topic") or "").strip()
+        if not topic:
+            continue
+        job = {
+            "topic":       topic,
+            "num_slides":  int(row.get("num_slides") or 8),
+            "theme":       row.get("theme") or DEFAULT_THEME,
+            "use_images":  _as_bool(row.get("use_images")),
+            "image_url":   row.get("image_url") or "",
+            "draft":       _as_bool(row.get("draft"), default=False),
+            "google_user": (row.get("google_user") or "").strip() or None,
+        }
+        if job["theme"] not in THEME_STYLES:
+            print(f"⚠️  Unknown theme '{job['theme']}' for '{topic}', using default")
+            job["theme"] = DEFAULT_THEME
+        key = f"{topic}|{job['num_slides']}|{job['theme']}|{job['use_images']}|{job['image_url']}"
+        if job["draft"]:
+            key += "|draft"
+        if job["google_user"]:
+            key += f"|{job['google_user']}"
+        job["id"] = str(row.get("id") or hashlib.sha1(key.encode("utf-8")).hexdigest()[:12])
+        jobs.append(job)
+    return jobs
+
+
+def completed_ids(results_path: str) -> set:
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut off by an interrupted run
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+class BatchRunner:
+    """Runs jobs on a deck-level worker pool with per-provider limits.
+
+    Groq and Google calls are gated by semaphores; Pexels lookups from all
+    decks share one bounded pool, so the global number of in-flight
+    requests to each provider never exceeds its limit. The Groq semaphore
+    gates each completion rather than each deck, since one sectioned or
+    hedged outline makes several concurrent requests.
+    """
+
+    def __init__(self, results_path: str, workers: int = 4, groq_concurrency: int = 2,
+                 pexels_concurrency: int = 6, google_concurrency: int = 2, use_cache: bool = True):
+        self.results_path = results_path
+        self.workers      = workers
+        self.use_cache    = use_cache
+        self.groq_slots   = threading.Semaphore(groq_concurrency)
+        self.google_slots = threading.Semaphore(google_concurrency)
+        self.image_pool   = ThreadPoolExecutor(max_workers=pexels_concurrency)
+        self._write_lock  = threading.Lock()
+
+    def _record(self, result: dict):
+        with self._write_lock, open(self.results_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run_job(self, job: dict) -> dict:
+        with as_user(job.get("google_user")), trace("batch.job") as job_trace:
+            result = self._run_job(job)
+        result["spans"] = job_trace.summary()
+        self._record(result)
+        return result
+
+    def _run_job(self, job: dict) -> dict:
+        timings = {}
+        stats   = Counter()
+        result  = {**job, "status": "ok", "link": None, "error": None}
+        t_start = time.time()
+        try:
+            with limit_groq(self.groq_slots):
+                t0 = time.time()
+                outline = build_outline(job["topic"], num_slides=job["num_slides"], use_cache=self.use_cache,
+                                        draft=job["draft"])
+                timings["research"] = round(time.time() - t0, 2)
+
+            image_urls = {}
+            if job["use_images"]:
+                t0 = time.time()
+                queries = {s.image_query for s in outline.slides if s.image_query and s.table is None}
+                futures = {q: submit(self.image_pool, find_image_url, q) for q in queries}
+                image_urls = {q: f.result() for q, f in futures.items()}
+                timings["images"] = round(time.time() - t0, 2)
+
+            with self.google_slots:
+                t0 = time.time()
+                result["link"] = create_presentation(
+                    outline,
+                    theme=job["theme"],
+                    image_url=job["image_url"],
+                    use_images=job["use_images"],
+                    image_urls=image_urls,
+                    stats=stats,
+                )
+                timings["slides"] = round(time.time() - t0, 2)
+            result["slides"] = len(outline.slides)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"]  = f"{type(e).__name__}: {e}"
+        timings["total"]    = round(time.time() - t_start, 2)
+        result["timings"]   = timings
+        result["api_calls"] = dict(stats)
+        result["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        return result
+
+    def run(self, jobs: list[dict]) -> Counter:
+        done    = completed_ids(self.results_path)
+        pending = [job for job in jobs if job["id"] not in done]
+        print(f"📋 {len(jobs)} jobs, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+
+        summary = Counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.run_job, job) for job in pending]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    summary[result["status"]] += 1
+                    icon = "✅" if result["status"] == "ok" else "❌"
+                    print(f"{icon} [{sum(summary.values())}/{len(pending)}] {result['topic']} "
+                          f"— {result['link'] or result['error']} ({result['timings']['total']}s)")
+            except KeyboardInterrupt:
+                print("\n⏹️  Interrupted — finishing in-flight decks, rerun to resume")
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                self.image_pool.shutdown(wait=False)
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many presentations from a CSV/JSONL topic list.")
+    parser.add_argument("input", help="CSV or JSONL file with a 'topic' column")
+    parser.add_argument("--out", default="results.jsonl", help="results JSONL (appended to; used for resume)")
+    parser.add_argument("--workers", type=int, default=4, help="decks in flight at once")
+    parser.add_argument("--groq-concurrency", type=int, default=2)
+    parser.add_argument("--pexels-concurrency", type=int, default=6)
+    parser.add_argument("--google-concurrency", type=int, default=2)
+    parser.add_argument("--no-cache", action="store_true", help="ignore cached outlines")
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        args.out,
+        workers=args.workers,
+        groq_concurrency=args.groq_concurrency,
+        pexels_concurrency=args.pexels_concurrency,
+        google_concurrency=args.google_concurrency,
+        use_cache=not args.no_cache,
+    )
+    summary = runner.run(load_jobs(args.input))
+    print(f"\n🏁 Done: {summary.get('ok', 0)} ok, {summary.get('error', 0)} failed → {args.out}")
+    queue = google_scheduler.metrics()
+    print(f"📡 Google quota queue: {queue['calls']} calls, {queue['retries']} retries, "
+          f"avg wait {queue['avg_wait_s']}s, max wait {queue['max_wait_s']}s, peak depth {queue['max_queued']}")
+    hedges = hedge_stats.summary()
+    if hedges["requests"]:
+        print(f"🏇 Hedged outlines: {hedges['hedges_fired']} of {hedges['requests']} requests hedged, "
+              f"{hedges['hedge_wins']} won by the hedge, ~{hedges['saved_s']}s saved")
+
+
+if __name__ == "__main__":
+    main()
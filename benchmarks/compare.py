@@ -0,0 +1,33 @@
+"""Compare two benchmark JSONL files scenario by scenario.
+
+    python benchmarks/compare.py before.jsonl after.jsonl
+"""
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return {r["scenario"]: r for r in map(json.loads, f) if r.get("scenario")}
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    before, after = load(sys.argv[1]), load(sys.argv[2])
+    metrics = ["sequential_total", "pipelined_total", "research", "images", "slides"]
+
+    print(f"{'scenario':<40}" + "".join(f"{m:>20}" for m in metrics) + f"{'google calls':>16}{'payload':>16}")
+    for scenario in sorted(before.keys() & after.keys()):
+        old, new = before[scenario], after[scenario]
+        row = f"{scenario:<40}"
+        for metric in metrics:
+            a, b = old["phases_s"].get(metric), new["phases_s"].get(metric)
+            row += f"{'n/a':>20}" if a is None or b is None else f"{a:>8.3f}→{b:<7.3f}{(b - a) / a * 100 if a else 0:+4.0f}%"
+        row += f"{old['remote_calls']['google']:>8}→{new['remote_calls']['google']:<7}"
+        row += f"{old['google_payload_bytes']:>8}→{new['google_payload_bytes']:<7}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+
+
+# ── Outline fixture ───────────────────────────────────────────────────────────
+def make_outline_json(topic: str, num_slides: int, tables: bool = True, images: bool = True) -> str:
+    """A realistic outline document in the shape the research prompt asks for."""
+    bullet = "Detailed bullet point of roughly twenty words explaining the concept with a concrete example and statistic"
+    slides = []
+    for i in range(1, num_slides + 1):
+        if tables and i % 4 == 0:
+            slides.append({
+                "title": f"Comparison {i}",
+                "bullets": [],
+                "notes": "Explain the table content and key takeaways in two or three sentences for the presenter.",
+                "image_query": "",
+                "table": {
+                    "headers": ["Aspect", "Option A", "Option B"],
+                    "rows": [[f"Row {r}", f"Detail {r} for option A", f"Detail {r} for option B"] for r in range(1, 5)],
+                },
+            })
+        else:
+            slides.append({
+                "title": f"Section {i}",
+                "bullets": [f"{bullet} ({i}.{b})" for b in range(1, 5)],
+                "notes": "Detailed speaker notes with two or three sentences providing background and context.",
+                "image_query": f"{topic} concept {i}" if images else "",
+                "table": None,
+            })
+    return json.dumps({"topic": topic, "slides": slides}, indent=2)
+
+
+# ── Groq ──────────────────────────────────────────────────────────────────────
+class FakeGroq:
+    """Stands in for groq.Groq. `latency` is time to first token; the body
+    then streams at `tokens_per_second` (≈4 characters per token)."""
+
+    def __init__(self, outline_json: str, latency: float = 0.5, tokens_per_second: float = 0):
+        self.outline_json      = outline_json
+        self.latency           = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self.chat  = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _generation_time(self) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(self.outline_json) / 4 / self.tokens_per_second
+
+    def _create(self, messages, model, temperature=None, max_tokens=None, stream=False, **kwargs):
+        self.calls += 1
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+            completion_tokens=len(self.outline_json) // 4,
+        )
+        if stream:
+            return self._stream(usage)
+        time.sleep(self.latency + self._generation_time())
+        message = SimpleNamespace(content=self.outline_json)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _stream(self, usage, chunk_chars: int = 64):
+        time.sleep(self.latency)
+        chunks = [self.outline_json[i:i + chunk_chars] for i in range(0, len(self.outline_json), chunk_chars)]
+        delay  = self._generation_time() / max(1, len(chunks))
+        for text in chunks:
+            if delay:
+                time.sleep(delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        # Groq reports usage on the final chunk
+        yield SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=usage))
+
+
+# ── Pexels ────────────────────────────────────────────────────────────────────
+class FakePexelsServer:
+    """Local HTTP server answering /v1/search like Pexels does. The photo
+    URLs it returns point back at itself and answer HEAD as JPEGs."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls   = 0
+        self._lock   = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.calls += 1
+                time.sleep(server.latency)
+                params   = parse_qs(urlparse(self.path).query)
+                slug     = params.get("query", [""])[0].replace(" ", "-")
+                per_page = int(params.get("per_page", ["1"])[0])
+                base     = f"http://127.0.0.1:{self.server.server_address[1]}/photos"
+                body     = json.dumps({"photos": [
+                    {"src": {"large": f"{base}/{slug}-{n}.jpg"}} for n in range(1, per_page + 1)
+                ]})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Ratelimit-Remaining", "100000")
+                self.end_headers()
+                self.wfile.write(body.encode("utf-8"))
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", "250000")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd  = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url    = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/search"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ── Slides / Drive ────────────────────────────────────────────────────────────
+class _Call:
+    def __init__(self, recorder, name, body, result):
+        self.recorder = recorder
+        self.name     = name
+        self.body     = body
+        self.result   = result
+
+    def execute(self):
+        self.recorder.record(self.name, self.body)
+        return self.result() if callable(self.result) else self.result
+
+
+class GoogleRecorder:
+    """Shared call log for the fake Slides and Drive services."""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls   = []
+        self._lock   = threading.Lock()
+
+    def record(self, name, body):
+        time.sleep(self.latency)
+        payload  = len(json.dumps(body, separators=(",", ":")).encode("utf-8")) if body else 0
+        requests = len(body.get("requests", [])) if isinstance(body, dict) else 0
+        with self._lock:
+            self.calls.append({"name": name, "requests": requests, "bytes": payload})
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "remote_calls":  len(self.calls),
+                "request_count": sum(c["requests"] for c in self.calls),
+                "payload_bytes": sum(c["bytes"] for c in self.calls),
+            }
+
+
+class _Presentations:
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.slide_ids = []
+
+    def create(self, body, fields=None):
+        result = {
+            "presentationId": "bench-presentation",
+            "slides": [{"objectId": "default_slide"}],
+            "masters": [{"objectId": "master"}],
+            "layouts": [
+                {
+                    "objectId": "layout_title",
+                    "layoutProperties": {"name": "TITLE"},
+                    "pageElements": [
+                        {"objectId": "layout_title_title", "shape": {"placeholder": {"type": "CENTERED_TITLE"}}},
+                        {"objectId": "layout_title_subtitle", "shape": {"placeholder": {"type": "SUBTITLE"}}},
+                    ],
+                },
+                {
+                    "objectId": "layout_title_and_body",
+                    "layoutProperties": {"name": "TITLE_AND_BODY"},
+                    "pageElements": [
+                        {"objectId": "layout_heading", "shape": {"placeholder": {"type": "TITLE"}}},
+                        {
+                            "objectId": "layout_body",
+                            "size": {"width": {"magnitude": 8229600, "unit": "EMU"}},
+                            "transform": {"scaleX": 1, "scaleY": 1, "translateX": 457200, "translateY": 1270000},
+                            "shape": {"placeholder": {"type": "BODY"}},
+                        },
+                    ],
+                },
+            ],
+        }
+        return _Call(self.recorder, "slides.create", body, result)
+
+    def batchUpdate(self, presentationId, body):
+        for request in body.get("requests", []):
+            if "createSlide" in request:
+                self.slide_ids.append(request["createSlide"]["objectId"])
+        return _Call(self.recorder, "slides.batchUpdate", body, lambda: {"replies": [{} for _ in body["requests"]]})
+
+    def get(self, presentationId, fields=None):
+        def result():
+            return {"slides": [
+                {
+                    "objectId": slide_id,
+                    "slideProperties": {"notesPage": {"notesProperties": {"speakerNotesObjectId": f"{slide_id}_notes"}}},
+                }
+                for slide_id in self.slide_ids
+            ]}
+        return _Call(self.recorder, "slides.get", None, result)
+
+
+class FakeSlidesService:
+    def __init__(self, recorder):
+        self._presentations = _Presentations(recorder)
+
+    def presentations(self):
+        return self._presentations
+
+
+class FakeDriveService:
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def permissions(self):
+        return SimpleNamespace(create=lambda fileId, body: _Call(self.recorder, "drive.permissions.create", body, {}))
+
+    def files(self):
+        return SimpleNamespace(
+            copy=lambda fileId, body, fields=None: _Call(self.recorder, "drive.files.copy", body, {"id": "bench-presentation"}),
+            delete=lambda fileId: _Call(self.recorder, "drive.files.delete", None, {}),
+        )
@@ -0,0 +1,87 @@
+"""Cold-start benchmark: how long importing each entry point takes.
+
+Every module is imported in a fresh interpreter with `python -X importtime`
+and the cumulative time of its top-level import is taken, median over
+`--repeat` runs. This covers app.py (what a Streamlit worker pays before
+the first widget renders) and every module with a `__main__` CLI.
+
+    python benchmarks/import_time.py --out imports.jsonl
+    # ...check out another commit...
+    python benchmarks/import_time.py --baseline imports.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "app", "pipeline", "research_agent", "slides_generator", "image_search", "batch", "jobs",
+    "renderers", "google_auth", "theme_templates", "model_router", "image_cache",
+]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def import_seconds(module: str) -> float:
+    """Cumulative import time of `module` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+    for line in reversed(proc.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"no importtime entry for {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of app.py and each CLI module.")
+    parser.add_argument("--modules", default=",".join(MODULES), help="comma-separated module names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write one JSON line per module")
+    parser.add_argument("--baseline", help="JSONL from an earlier run to compare against")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {r["module"]: r for r in map(json.loads, f)}
+
+    meta    = {"commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    results = []
+    print(f"{'module':<20}{'import (s)':>12}" + (f"{'baseline':>12}{'change':>10}" if baseline else ""))
+    for module in [m.strip() for m in args.modules.split(",") if m.strip()]:
+        try:
+            seconds = statistics.median(import_seconds(module) for _ in range(args.repeat))
+        except RuntimeError as e:
+            print(f"{module:<20}{'error':>12}  {e}")
+            continue
+        results.append({**meta, "module": module, "import_s": round(seconds, 4)})
+        row = f"{module:<20}{seconds:>12.3f}"
+        if module in baseline:
+            old = baseline[module]["import_s"]
+            row += f"{old:>12.3f}{(seconds - old) / old * 100 if old else 0:>+9.0f}%"
+        print(row)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Offline benchmark for the generation pipeline.
+
+Groq, Pexels, Slides and Drive are replaced by local stand-ins with
+configurable latency (see fakes.py), so no API keys or network access are
+needed. Each scenario writes one JSON line with per-phase wall time, remote
+call counts, Slides request count and payload size:
+
+    python benchmarks/run.py --slides 5,15,50 --out bench.jsonl
+
+Compare two commits by running the same command on each and diffing the
+JSONL files (`python benchmarks/compare.py old.jsonl new.jsonl`).
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep benchmark runs away from real keys and the user's caches
+_scratch = tempfile.mkdtemp(prefix="ppt-bench-")
+os.environ["GROQ_API_KEY"]      = "bench"
+os.environ["PEXELS_API_KEY"]    = "bench"
+os.environ["OUTLINE_CACHE_DIR"] = os.path.join(_scratch, "outlines")
+os.environ["IMAGE_CACHE_PATH"]  = os.path.join(_scratch, "images.sqlite3")
+os.environ["THEME_TEMPLATES_PATH"] = os.path.join(_scratch, "theme_templates.json")
+os.environ["MODEL_STATS_PATH"]  = os.path.join(_scratch, "model_stats.json")
+# The stand-ins have no quota; don't let the Google scheduler throttle them
+for _quota in ("SLIDES_WRITES_PER_MINUTE", "SLIDES_USER_WRITES_PER_MINUTE", "SLIDES_READS_PER_MINUTE",
+               "SLIDES_USER_READS_PER_MINUTE", "DRIVE_REQUESTS_PER_MINUTE", "DRIVE_USER_REQUESTS_PER_MINUTE"):
+    os.environ[_quota] = "1000000"
+
+from collections import Counter  # noqa: E402
+import image_search  # noqa: E402
+import pipeline  # noqa: E402
+import providers  # noqa: E402
+import research_agent  # noqa: E402
+import slides_generator  # noqa: E402
+from image_cache import ImageCache  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeGroq, FakePexelsServer, GoogleRecorder, FakeSlidesService, FakeDriveService, make_outline_json,
+)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _fresh_image_stack(pexels_url: str, scenario_id: str):
+    image_search.PEXELS_API_KEY = "bench"
+    image_search.pexels_client  = image_search.PexelsClient(
+        api_key="bench", base_url=pexels_url, rate_per_hour=1e9, burst=1e6,
+    )
+    providers.override("image_cache", ImageCache(os.path.join(_scratch, f"images-{scenario_id}.sqlite3")))
+
+
+def _install_google(latency: float):
+    recorder = GoogleRecorder(latency)
+    services = (FakeSlidesService(recorder), FakeDriveService(recorder))
+    slides_generator.get_services = lambda: services
+    pipeline.get_services         = lambda: services
+    return recorder
+
+
+def run_scenario(num_slides, tables, images, theme, args, pexels) -> dict:
+    scenario_id = f"{num_slides}-{int(tables)}-{int(images)}-{theme}".replace(" ", "_")
+    topic = "Benchmark Topic"
+    groq  = FakeGroq(make_outline_json(topic, num_slides, tables, images), args.groq_latency, args.groq_tps)
+    providers.override("groq", groq)
+    phases = {}
+
+    # Sequential path: research → images → slides
+    t0 = time.perf_counter()
+    outline = research_agent.build_outline(topic, num_slides=num_slides, use_cache=False)
+    phases["research"] = time.perf_counter() - t0
+
+    _fresh_image_stack(pexels.url, scenario_id + "-seq")
+    pexels_before = pexels.calls
+    t0 = time.perf_counter()
+    queries    = [s.image_query for s in outline.slides if s.image_query and s.table is None] if images else []
+    image_urls = image_search.find_image_urls(queries)
+    phases["images"] = time.perf_counter() - t0
+    pexels_calls = pexels.calls - pexels_before
+
+    styles = slides_generator.THEME_STYLES[theme]
+    t0 = time.perf_counter()
+    table_requests = []
+    for i, slide in enumerate(outline.slides, start=1):
+        if slide.table is not None:
+            table_requests += slides_generator.build_table_requests(
+                f"slide_{i}", slide.table, i, styles["table_header_color"], styles["table_body_text_color"],
+            )
+    phases["table_build"] = time.perf_counter() - t0
+    table_stats = slides_generator.request_stats(table_requests)
+
+    recorder = _install_google(args.google_latency)
+    stats = Counter()
+    t0 = time.perf_counter()
+    slides_generator.create_presentation(
+        outline, theme=theme, use_images=images, image_urls=image_urls, stats=stats,
+    )
+    phases["slides"] = time.perf_counter() - t0
+    google = recorder.summary()
+    phases["sequential_total"] = phases["research"] + phases["images"] + phases["slides"]
+
+    # Pipelined path, as used by the Streamlit app
+    _fresh_image_stack(pexels.url, scenario_id + "-pipe")
+    _install_google(args.google_latency)
+    t0 = time.perf_counter()
+    pipeline.generate_presentation(topic, num_slides=num_slides, theme=theme, use_images=images, use_cache=False)
+    phases["pipelined_total"] = time.perf_counter() - t0
+    groq_calls = groq.calls
+
+    return {
+        "scenario":   scenario_id,
+        "num_slides": num_slides,
+        "tables":     tables,
+        "images":     images,
+        "theme":      theme,
+        "phases_s":   {name: round(value, 4) for name, value in phases.items()},
+        "remote_calls": {
+            "groq":   groq_calls,
+            "pexels": pexels_calls,
+            "google": google["remote_calls"],
+        },
+        "google_requests":      google["request_count"],
+        "google_payload_bytes": google["payload_bytes"],
+        "table_requests":       table_stats["requests"],
+        "table_payload_bytes":  table_stats["bytes"],
+    }
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark with local stand-ins for all remote APIs.")
+    parser.add_argument("--slides", default="5,15,30,50", help="comma-separated slide counts")
+    parser.add_argument("--themes", default="all", help="comma-separated theme names, or 'all'")
+    parser.add_argument("--tables", default="on,off", help="on, off or on,off")
+    parser.add_argument("--images", default="on,off", help="on, off or on,off")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="seconds to first token")
+    parser.add_argument("--groq-tps", type=float, default=0, help="simulated tokens/s (0 = instant body)")
+    parser.add_argument("--pexels-latency", type=float, default=0.05)
+    parser.add_argument("--google-latency", type=float, default=0.2)
+    parser.add_argument("--out", default="-", help="JSONL output file ('-' for stdout)")
+    args = parser.parse_args()
+
+    themes = list(slides_generator.THEME_STYLES) if args.themes == "all" else _csv(args.themes)
+    meta = {"commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        with FakePexelsServer(args.pexels_latency) as pexels:
+            for num_slides, tables, images, theme in itertools.product(
+                [int(n) for n in _csv(args.slides)],
+                [t == "on" for t in _csv(args.tables)],
+                [i == "on" for i in _csv(args.images)],
+                themes,
+            ):
+                # Pipeline progress prints go to stderr so stdout stays valid JSONL
+                with contextlib.redirect_stdout(sys.stderr):
+                    result = {**meta, **run_scenario(num_slides, tables, images, theme, args, pexels)}
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
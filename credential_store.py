@@ -0,0 +1,217 @@
+"""Google credentials per user or service account.
+
+Each key (a Google account name, or a service account registered for it)
+has its own token file, an in-process lock and a cross-process file lock,
+so concurrent threads and worker processes never refresh or rewrite the
+same token at once. Valid credentials are served from memory and a
+background thread refreshes them before they expire.
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from atomic_file import write_atomic
+from google_scheduler import DEFAULT_USER
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking is per process only
+    fcntl = None
+
+SCOPES = [
+    "https://www.googleapis.com/auth/presentations",
+    "https://www.googleapis.com/auth/drive"
+]
+
+TOKEN_PATH          = "token.json"   # the default user's token, as before
+CLIENT_SECRETS_PATH = "credentials.json"
+TOKENS_DIR          = os.getenv("GOOGLE_TOKENS_DIR", os.path.join(".cache", "tokens"))
+SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", "")
+INTERACTIVE_AUTH    = os.getenv("GOOGLE_INTERACTIVE_AUTH", "0") == "1"
+REFRESH_MARGIN      = 300  # refresh this many seconds before the token expires
+
+
+class CredentialsRequired(RuntimeError):
+    """No usable credentials for a user and interactive sign-in is off."""
+
+
+def _save_token(creds, path: str):
+    write_atomic(path, creds.to_json())   # readers never see a half-written token
+
+
+def _seconds_to_expiry(creds) -> float:
+    if not creds.expiry:
+        return float("inf")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth uses naive UTC
+    return (creds.expiry - now).total_seconds()
+
+
+def _is_service_account_file(path: str) -> bool:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("type") == "service_account"
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+class CredentialStore:
+    """Thread- and process-safe Google credentials keyed by user.
+
+    `get(key)` returns valid credentials from memory when it can. Otherwise
+    it takes the key's lock and token file lock, re-reads the token file
+    (another process may have refreshed it already), refreshes if needed
+    and writes the result atomically. Service accounts are refreshed in
+    memory only. With `interactive` off a missing or revoked token raises
+    CredentialsRequired instead of opening a browser sign-in on a request
+    thread; run `python google_auth.py --user KEY` to sign in once.
+    """
+
+    def __init__(self, tokens_dir: str = TOKENS_DIR, default_token_path: str = TOKEN_PATH,
+                 client_secrets_path: str = CLIENT_SECRETS_PATH, interactive: bool = INTERACTIVE_AUTH,
+                 refresh_margin: int = REFRESH_MARGIN):
+        self.tokens_dir          = tokens_dir
+        self.default_token_path  = default_token_path
+        self.client_secrets_path = client_secrets_path
+        self.interactive         = interactive
+        self.refresh_margin      = refresh_margin
+        self._cache     = {}   # key -> credentials
+        self._locks     = {}   # key -> threading.Lock
+        self._service_accounts = {}
+        self._lock      = threading.Lock()
+        self._refresher = None
+
+        if SERVICE_ACCOUNT_FILE:
+            self.register_service_account(DEFAULT_USER, SERVICE_ACCOUNT_FILE)
+        elif _is_service_account_file(client_secrets_path):
+            self.register_service_account(DEFAULT_USER, client_secrets_path)
+
+    def register_service_account(self, key: str, key_file: str):
+        """Serve `key` from a service account key file instead of a user token."""
+        with self._lock:
+            self._service_accounts[key] = key_file
+            self._cache.pop(key, None)
+
+    def token_path(self, key: str) -> str:
+        if key == DEFAULT_USER:
+            return self.default_token_path
+        return os.path.join(self.tokens_dir, re.sub(r"[^A-Za-z0-9_.@-]", "_", key) + ".json")
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        """Exclusive lock on the key's token file across processes."""
+        path = self.token_path(key) + ".lock"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _fresh(self, creds) -> bool:
+        return creds.valid and _seconds_to_expiry(creds) > self.refresh_margin
+
+    def get(self, key: str = DEFAULT_USER):
+        """Valid credentials for `key`, refreshed or loaded if necessary."""
+        key   = key or DEFAULT_USER
+        creds = self._cache.get(key)
+        if creds is not None and self._fresh(creds):
+            return creds
+        with self._key_lock(key):
+            creds = self._cache.get(key)
+            if creds is None or not self._fresh(creds):
+                creds = self._load(key, creds)
+                self._cache[key] = creds
+        self._start_refresher()
+        return creds
+
+    def _load(self, key: str, creds):
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+
+        key_file = self._service_accounts.get(key)
+        if key_file:
+            if creds is None:
+                from google.oauth2 import service_account
+                creds = service_account.Credentials.from_service_account_file(key_file, scopes=SCOPES)
+            creds.refresh(Request())
+            return creds
+
+        path = self.token_path(key)
+        with self._file_lock(key):
+            creds = self._read(path)
+            if creds is not None and self._fresh(creds):
+                return creds
+            if creds is not None and creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                    _save_token(creds, path)
+                    return creds
+                except RefreshError as e:
+                    print(f"⚠️  Google token for '{key}' could not be refreshed: {e}")
+            if not self.interactive:
+                raise CredentialsRequired(
+                    f"No valid Google credentials for '{key}'. Sign in once with: python google_auth.py --user {key}"
+                )
+            return self._sign_in(key, path)
+
+    def _read(self, path: str):
+        from google.oauth2.credentials import Credentials
+        if not os.path.exists(path):
+            return None
+        try:
+            return Credentials.from_authorized_user_file(path, SCOPES)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️  Ignoring unreadable token file {path}: {e}")
+            return None
+
+    def _sign_in(self, key: str, path: str):
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow  = InstalledAppFlow.from_client_secrets_file(self.client_secrets_path, SCOPES)
+        creds = flow.run_local_server(port=0)
+        _save_token(creds, path)
+        print(f"🔑 Signed in to Google as '{key}'")
+        return creds
+
+    def sign_in(self, key: str = DEFAULT_USER):
+        """Run the browser sign-in for `key` and store its token."""
+        key = key or DEFAULT_USER
+        with self._key_lock(key), self._file_lock(key):
+            creds = self._sign_in(key, self.token_path(key))
+            self._cache[key] = creds
+        return creds
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="google-token-refresh",
+                                                   daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                cached = dict(self._cache)
+            waits = {key: _seconds_to_expiry(creds) - self.refresh_margin for key, creds in cached.items()}
+            due   = [key for key, wait in waits.items() if wait <= 0]
+            if not due:
+                time.sleep(max(1, min(list(waits.values()) + [60])))
+                continue
+            for key in due:
+                try:
+                    self.get(key)
+                    print(f"🔑 Google token refreshed for '{key}'")
+                except Exception as e:
+                    print(f"⚠️  Background token refresh failed for '{key}': {e}")
+                    with self._lock:
+                        self._cache.pop(key, None)   # the next request retries and reports the error
+            time.sleep(1)
@@ -1,30 +1,64 @@
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import os
+import argparse
+import threading
+import providers
+from credential_store import SCOPES, CredentialsRequired  # noqa: F401  (re-exported for callers)
+from google_scheduler import current_user
+
+
+class ServiceProvider:
+    """Process-wide source of Slides and Drive clients.
+
+    Credentials come from the shared CredentialStore for the Google user
+    that is current when the call is made (google_scheduler.as_user), so
+    concurrent generations for different accounts never share a token.
+    API clients are built from the discovery documents bundled with
+    googleapiclient (no network fetch). The Google SDKs are imported on
+    first use, not with this module. Each thread gets its own clients per
+    user because the underlying httplib2 transport is not thread-safe.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+        self._local = threading.local()
+
+    @property
+    def store(self):
+        # Resolved on first use, not in __init__: this runs inside the
+        # "google" provider factory
+        if self._store is None:
+            self._store = providers.get("credentials")
+        return self._store
+
+    def credentials(self, user: str = None):
+        return self.store.get(user or current_user())
+
+    def services(self, user: str = None):
+        user     = user or current_user()
+        creds    = self.credentials(user)
+        clients  = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        services = clients.get(user)
+        if services is None or services[2] is not creds:
+            from googleapiclient.discovery import build
+            slides = build("slides", "v1", credentials=creds, static_discovery=True, cache_discovery=False)
+            drive  = build("drive", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
+            services = (slides, drive, creds)
+            clients[user] = services
+        return services[0], services[1]
 
-SCOPES = [
-    "https://www.googleapis.com/auth/presentations",
-    "https://www.googleapis.com/auth/drive"
-]
 
 def get_services():
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as f:
-            f.write(creds.to_json())
-    slides = build("slides", "v1", credentials=creds)
-    drive = build("drive", "v3", credentials=creds)
-    return slides, drive
+    return providers.get("google").services()
 
 if __name__ == "__main__":
-    slides, drive = get_services()
+    parser = argparse.ArgumentParser(description="Sign in to Google and check Slides/Drive access.")
+    parser.add_argument("--user", default=current_user(), help="account key to store the token under")
+    args  = parser.parse_args()
+    store = providers.get("credentials")
+    try:
+        store.get(args.user)
+    except CredentialsRequired:
+        store.sign_in(args.user)
+    slides, drive = providers.get("google").services(args.user)
     print("✅ Google Auth successful!")
@@ -0,0 +1,166 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from rate_limit import TokenBucket, backoff_delay
+
+# Slides API defaults: 600 writes / 3000 reads per minute per project,
+# 60 writes / 600 reads per minute per user. Drive is far more generous.
+QUOTAS = {
+    "slides.write": (
+        float(os.getenv("SLIDES_WRITES_PER_MINUTE", "600")),
+        float(os.getenv("SLIDES_USER_WRITES_PER_MINUTE", "60")),
+    ),
+    "slides.read": (
+        float(os.getenv("SLIDES_READS_PER_MINUTE", "3000")),
+        float(os.getenv("SLIDES_USER_READS_PER_MINUTE", "600")),
+    ),
+    "drive": (
+        float(os.getenv("DRIVE_REQUESTS_PER_MINUTE", "12000")),
+        float(os.getenv("DRIVE_USER_REQUESTS_PER_MINUTE", "2400")),
+    ),
+}
+GOOGLE_MAX_RETRIES = int(os.getenv("GOOGLE_MAX_RETRIES", "5"))
+RETRY_STATUSES     = {429, 500, 502, 503, 504}
+DEFAULT_USER       = "default"
+
+_current_user = contextvars.ContextVar("google_user", default=DEFAULT_USER)
+
+
+@contextmanager
+def as_user(user_id: str):
+    """Charge Google calls made inside the block to `user_id`'s budget.
+
+    The per-user quota belongs to the Google account whose credentials make
+    the calls, so this should name that account, not the app session.
+    """
+    token = _current_user.set(user_id or DEFAULT_USER)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def current_user() -> str:
+    return _current_user.get()
+
+
+def quota_kind(name: str) -> str:
+    """Map a call name like 'slides.batchUpdate' to its quota bucket."""
+    if name.startswith("drive."):
+        return "drive"
+    if name.startswith("slides.") and name.endswith(".get"):
+        return "slides.read"
+    return "slides.write"
+
+
+def http_status(error):
+    """HTTP status of a googleapiclient HttpError (or None for anything else)."""
+    return getattr(getattr(error, "resp", None), "status", None)
+
+
+def _retry_after(error):
+    headers = getattr(error, "resp", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class GoogleScheduler:
+    """Shared gate for every Slides and Drive call.
+
+    Each call waits for a token from both the project-wide bucket and the
+    calling user's bucket for its quota kind, so bursts from many sessions
+    queue up instead of coming back as 429s. 429 and 5xx responses are
+    retried with jittered exponential backoff; a 429 also pauses that
+    user's bucket so the other queued calls back off with it.
+    """
+
+    def __init__(self, quotas: dict = None, max_retries: int = GOOGLE_MAX_RETRIES):
+        self.quotas      = quotas or QUOTAS
+        self.max_retries = max_retries
+        self._project    = {kind: self._bucket(project) for kind, (project, _) in self.quotas.items()}
+        self._users      = {}
+        self._lock       = threading.Lock()
+        self._queued     = 0
+        self._stats      = {
+            "calls": 0, "retries": 0, "throttled": 0, "failed": 0,
+            "max_queued": 0, "wait_s": 0.0, "max_wait_s": 0.0,
+        }
+
+    @staticmethod
+    def _bucket(per_minute: float) -> TokenBucket:
+        # A full minute of budget as burst, refilled continuously
+        return TokenBucket(rate=per_minute / 60.0, capacity=max(1.0, per_minute))
+
+    def _user_bucket(self, kind: str, user: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._users.get((kind, user))
+            if bucket is None:
+                bucket = self._users[(kind, user)] = self._bucket(self.quotas[kind][1])
+            return bucket
+
+    def _wait_for_slot(self, kind: str, user: str) -> float:
+        with self._lock:
+            self._queued += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._queued)
+        t0 = time.monotonic()
+        try:
+            self._user_bucket(kind, user).acquire()
+            self._project[kind].acquire()
+        finally:
+            waited = time.monotonic() - t0
+            with self._lock:
+                self._queued -= 1
+                self._stats["wait_s"]    += waited
+                self._stats["max_wait_s"] = max(self._stats["max_wait_s"], waited)
+        return waited
+
+    def execute(self, request, name: str, call_span=None):
+        """Run `request.execute()` under the quota for `name`, retrying
+        throttled and transient failures."""
+        kind = quota_kind(name)
+        user = current_user()
+        waited, attempt = 0.0, 0
+        while True:
+            waited += self._wait_for_slot(kind, user)
+            with self._lock:
+                self._stats["calls"] += 1
+            try:
+                result = request.execute()
+                break
+            except Exception as e:
+                status = http_status(e)
+                if status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    with self._lock:
+                        self._stats["failed"] += 1
+                    raise
+                delay = _retry_after(e) or backoff_delay(attempt)
+                with self._lock:
+                    self._stats["retries"] += 1
+                    self._stats["throttled"] += status == 429
+                if status == 429:
+                    self._user_bucket(kind, user).pause_until(time.monotonic() + delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                print(f"  ⏳ Google {name} returned {status}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        if call_span is not None:
+            call_span.set(queue_wait_s=round(waited, 4), retries=attempt, user=user)
+        return result
+
+    def metrics(self) -> dict:
+        """Queue depth, wait time and retry counters since startup."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queued"] = self._queued
+        stats["avg_wait_s"] = round(stats["wait_s"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["wait_s"]     = round(stats["wait_s"], 3)
+        stats["max_wait_s"] = round(stats["max_wait_s"], 3)
+        return stats
+
+
+scheduler = GoogleScheduler()
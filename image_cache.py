@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import threading
+import time
+
+IMAGE_CACHE_PATH        = os.getenv("IMAGE_CACHE_PATH", os.path.join(".cache", "images.sqlite3"))
+IMAGE_CACHE_TTL         = int(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ImageCache:
+    """SQLite-backed query → image URL cache with TTL expiry and LRU eviction.
+
+    SQLite's file locking (WAL mode) makes one cache file safe to share
+    between Streamlit sessions, threads and worker processes. Hit/miss
+    counters are persisted so they add up across all of them.
+    """
+
+    def __init__(self, path: str = IMAGE_CACHE_PATH, ttl: int = IMAGE_CACHE_TTL,
+                 max_entries: int = IMAGE_CACHE_MAX_ENTRIES):
+        self.path        = path
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self._local      = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " key TEXT PRIMARY KEY, url TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS images_accessed ON images(accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    # One connection per thread — sqlite3 connections must not be shared
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(query: str, orientation: str = "landscape") -> str:
+        return f"{orientation}:{normalize_query(query)}"
+
+    def get(self, query: str, orientation: str = "landscape"):
+        try:
+            return self._get(self.key(query, orientation))
+        except sqlite3.Error as e:
+            print(f"Image cache read failed for '{query}': {e}")
+            return None
+
+    def set(self, query: str, url: str, orientation: str = "landscape"):
+        try:
+            self._set(self.key(query, orientation), url)
+        except sqlite3.Error as e:
+            print(f"Image cache write failed for '{query}': {e}")
+
+    def delete(self, query: str, orientation: str = "landscape"):
+        try:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM images WHERE key = ?", (self.key(query, orientation),))
+        except sqlite3.Error as e:
+            print(f"Image cache delete failed for '{query}': {e}")
+
+    def delete_url(self, url: str):
+        """Drop every query cached to `url`, e.g. after Google failed to fetch it."""
+        try:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM images WHERE url = ?", (url,))
+        except sqlite3.Error as e:
+            print(f"Image cache delete failed for {url}: {e}")
+
+    def _get(self, key: str):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT url, created FROM images WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                conn.execute("UPDATE images SET accessed = ? WHERE key = ?", (now, key))
+                conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'hits'")
+                return row[0]
+            if row:
+                conn.execute("DELETE FROM images WHERE key = ?", (key,))
+            conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'misses'")
+        return None
+
+    def _set(self, key: str, url: str):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?)", (key, url, now, now))
+            conn.execute("DELETE FROM images WHERE created < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM images WHERE key IN ("
+                " SELECT key FROM images ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM images")
+            conn.execute("UPDATE stats SET value = 0")
+
+    def stats(self) -> dict:
+        with self._conn() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries  = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "hits":     hits,
+            "misses":   misses,
+            "entries":  entries,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    print(ImageCache().stats())
@@ -1,33 +1,261 @@
 import os
-import requests
-from dotenv import load_dotenv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from image_cache import normalize_query
+from rate_limit import TokenBucket, backoff_delay
+from tracing import span, submit
+import providers
 
-load_dotenv()
+providers.load_env()
 
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
+PEXELS_API_URL = os.getenv("PEXELS_API_URL", "https://api.pexels.com/v1/search")
+IMAGE_WORKERS  = int(os.getenv("IMAGE_WORKERS", "6"))
 
-def find_image_url(query: str):
-    """Search Pexels for a public image URL matching the query."""
+# Candidate URLs are checked before they reach Google: Slides only inserts
+# PNG/JPEG/GIF images under 50 MB, and one bad URL fails the whole batchUpdate
+IMAGE_CANDIDATES    = int(os.getenv("IMAGE_CANDIDATES", "3"))   # Pexels results to fall back through
+IMAGE_CHECK_TIMEOUT = float(os.getenv("IMAGE_CHECK_TIMEOUT", "3"))
+IMAGE_MAX_BYTES     = 50 * 1024 * 1024
+IMAGE_CONTENT_TYPES = ("image/png", "image/jpeg", "image/gif")
+
+# Pexels allows 200 requests/hour by default; raise these for upgraded keys
+PEXELS_RATE_PER_HOUR = float(os.getenv("PEXELS_RATE_PER_HOUR", "200"))
+PEXELS_BURST         = float(os.getenv("PEXELS_BURST", "50"))
+
+
+class PexelsClient:
+    """Pooled Pexels search client that respects the API's rate limits.
+
+    A single `requests.Session`, created on first use, keeps TLS
+    connections alive between calls.
+    A token bucket throttles outgoing requests and is re-synced from the
+    `X-Ratelimit-*` headers; 429s pause the bucket until the reset time.
+    Transient failures are retried with jittered backoff, but a call never
+    waits longer than `max_wait` — it returns None instead.
+    """
+
+    def __init__(
+        self,
+        api_key: str = PEXELS_API_KEY,
+        base_url: str = PEXELS_API_URL,
+        rate_per_hour: float = PEXELS_RATE_PER_HOUR,
+        burst: float = PEXELS_BURST,
+        pool_size: int = IMAGE_WORKERS,
+        max_retries: int = 2,
+        max_wait: float = 3.0,
+        timeout: float = 5.0,
+    ):
+        self.api_key     = api_key
+        self.base_url    = base_url
+        self.max_retries = max_retries
+        self.max_wait    = max_wait
+        self.timeout     = timeout
+        self.pool_size   = pool_size
+        self.bucket      = TokenBucket(rate=rate_per_hour / 3600, capacity=burst)
+        self._session    = None
+        self._lock       = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, self.pool_size))
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    if self.api_key:
+                        session.headers["Authorization"] = self.api_key
+                    self._session = session
+        return self._session
+
+    def _sync_rate_limit(self, headers):
+        remaining = headers.get("X-Ratelimit-Remaining")
+        reset     = headers.get("X-Ratelimit-Reset")
+        try:
+            if remaining is not None:
+                remaining = int(remaining)
+                if remaining <= 0 and reset is not None:
+                    self.bucket.pause_until(time.monotonic() + max(0, int(reset) - time.time()))
+                else:
+                    self.bucket.limit_tokens(remaining)
+        except ValueError:
+            pass
+
+    def _retry_after(self, response) -> float:
+        retry_after = response.headers.get("Retry-After")
+        reset       = response.headers.get("X-Ratelimit-Reset")
+        try:
+            if retry_after is not None:
+                return float(retry_after)
+            if reset is not None:
+                return max(0.0, int(reset) - time.time())
+        except ValueError:
+            pass
+        return backoff_delay(0)
+
+    def search(self, query: str, per_page: int = 1, orientation: str = "landscape"):
+        """Return the list of photo dicts for `query`, or None on failure."""
+        if not self.api_key or not query:
+            return None
+        with span("pexels.search", query=query, per_page=per_page) as search_span:
+            photos = self._search(query, per_page, orientation, search_span)
+            search_span.set(results=len(photos) if photos is not None else None)
+            return photos
+
+    def _search(self, query, per_page, orientation, search_span):
+        import requests
+        params = {"query": query, "per_page": per_page, "orientation": orientation}
+
+        for attempt in range(self.max_retries + 1):
+            search_span.set(retries=attempt)
+            if not self.bucket.acquire(timeout=self.max_wait):
+                search_span.set(outcome="budget_exhausted")
+                print(f"Image search skipped for '{query}': Pexels rate budget exhausted")
+                return None
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"Image search attempt {attempt + 1} failed for '{query}': {e}")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            self._sync_rate_limit(response.headers)
+            search_span.set(http_status=response.status_code, response_bytes=len(response.content))
+
+            if response.status_code == 429:
+                wait = self._retry_after(response)
+                self.bucket.pause_until(time.monotonic() + wait)
+                if wait > self.max_wait:
+                    search_span.set(outcome="rate_limited")
+                    print(f"Image search skipped for '{query}': rate limited for {wait:.0f}s")
+                    return None
+                continue
+            if response.status_code >= 500:
+                time.sleep(backoff_delay(attempt))
+                continue
+            if response.status_code != 200:
+                print(f"Image search failed for '{query}': HTTP {response.status_code}")
+                return None
+            return response.json().get("photos", [])
+
+        search_span.set(outcome="gave_up")
+        print(f"Image search gave up on '{query}' after {self.max_retries + 1} attempts")
+        return None
+
+    def find_image_urls(self, query: str, orientation: str = "landscape", count: int = IMAGE_CANDIDATES) -> list:
+        """Up to `count` candidate image URLs for `query`, best match first."""
+        photos = self.search(query, per_page=count, orientation=orientation)
+        return [photo["src"]["large"] for photo in photos or [] if photo.get("src", {}).get("large")]
+
+    def find_image_url(self, query: str, orientation: str = "landscape"):
+        urls = self.find_image_urls(query, orientation, count=1)
+        return urls[0] if urls else None
+
+
+pexels_client = PexelsClient()
+
+
+def check_image_url(url: str, timeout: float = IMAGE_CHECK_TIMEOUT) -> bool:
+    """Whether Google Slides should be able to fetch `url` as an image:
+    reachable, a PNG/JPEG/GIF content type and not over the size limit."""
+    import requests
+    if not url or not url.startswith(("http://", "https://")):
+        return False
+    # The shared "http" session carries no Pexels key, since these go to arbitrary hosts
+    session = providers.get("http")
+    with span("image.check", url=url) as check:
+        try:
+            response = session.head(url, timeout=timeout, allow_redirects=True)
+            if response.status_code in (403, 405, 501):
+                # Some hosts refuse HEAD; read only the headers of a GET
+                response = session.get(url, timeout=timeout, allow_redirects=True, stream=True)
+                response.close()
+        except requests.RequestException as e:
+            check.set(ok=False, error=type(e).__name__)
+            print(f"  ⚠️  Image unreachable {url}: {type(e).__name__}")
+            return False
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        try:
+            size = int(response.headers.get("Content-Length", "0"))
+        except ValueError:
+            size = 0
+        check.set(http_status=response.status_code, content_type=content_type, bytes=size)
+
+        if response.status_code != 200:
+            problem = f"HTTP {response.status_code}"
+        elif content_type not in IMAGE_CONTENT_TYPES:
+            problem = f"content type '{content_type or 'unknown'}'"
+        elif size > IMAGE_MAX_BYTES:
+            problem = f"{size / 1024 / 1024:.0f} MB"
+        else:
+            check.set(ok=True)
+            return True
+        check.set(ok=False)
+        print(f"  ⚠️  Image rejected {url}: {problem}")
+        return False
+
+
+def find_image_url(query: str, orientation: str = "landscape", use_cache: bool = True, validate: bool = True):
+    """Search Pexels for a public image URL matching the query.
+
+    With `validate`, each Pexels result in turn is checked with
+    check_image_url and the first one that passes is used and cached.
+    Cached URLs passed that check when stored, so hits are returned as is;
+    callers report a URL that later fails with forget_image_url.
+    """
     if not PEXELS_API_KEY or not query:
         return None
-    try:
-        headers = {"Authorization": PEXELS_API_KEY}
-        params = {"query": query, "per_page": 1, "orientation": "landscape"}
-        response = requests.get(
-            "https://api.pexels.com/v1/search",
-            headers=headers,
-            params=params,
-            timeout=5
-        )
-        data = response.json()
-        photos = data.get("photos", [])
-        if photos:
-            return photos[0]["src"]["large"]
-    except Exception as e:
-        print(f"Image search failed for '{query}': {e}")
-    return None
+    with span("image.lookup", query=query) as lookup:
+        if use_cache:
+            cached = providers.get("image_cache").get(query, orientation)
+            lookup.set(cache_hit=bool(cached))
+            if cached:
+                return cached
+        try:
+            candidates = pexels_client.find_image_urls(query, orientation, count=IMAGE_CANDIDATES if validate else 1)
+            url = None
+            for attempt, candidate in enumerate(candidates):
+                if not validate or check_image_url(candidate):
+                    url = candidate
+                    lookup.set(fallbacks=attempt)
+                    break
+            if url and use_cache:
+                providers.get("image_cache").set(query, url, orientation)
+            lookup.set(found=bool(url))
+            return url
+        except Exception as e:
+            lookup.set(error=str(e))
+            print(f"Image search failed for '{query}': {e}")
+        return None
+
+
+def forget_image_url(url: str):
+    """Evict `url` from the cache after it failed downstream, so the next
+    lookup of its query searches and validates afresh."""
+    if url:
+        providers.get("image_cache").delete_url(url)
+
+
+def find_image_urls(queries, max_workers: int = IMAGE_WORKERS) -> dict:
+    """Resolve many queries concurrently; returns {query: url or None}.
+    Queries that differ only in case or spacing are looked up once."""
+    queries = [q for q in queries if q]
+    unique  = list(dict.fromkeys(normalize_query(q) for q in queries))
+    if not unique:
+        return {}
+    workers = max(1, min(max_workers, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {key: submit(pool, find_image_url, key) for key in unique}
+    return {q: futures[normalize_query(q)].result() for q in queries}
 
 
 if __name__ == "__main__":
     url = find_image_url("solar panels on rooftop")
     print(url)
+    print(providers.get("image_cache").stats())
@@ -0,0 +1,237 @@
+"""Background generation jobs.
+
+The Streamlit script submits a generation and polls its state instead of
+running it inline, so a browser refresh or a second click doesn't throw
+away a deck that is half done. Job state is written to JOBS_DIR after
+every change; a finished job can be reopened from its ID after a rerun,
+reconnect or server restart.
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from atomic_file import write_atomic
+from pipeline import generate_presentation
+from renderers import PptxBackend
+from research_agent import build_outline, is_outline_cached
+from slides_generator import THEME_STYLES
+from tracing import trace, span
+from google_scheduler import as_user
+
+JOBS_DIR       = os.getenv("JOBS_DIR", os.path.join(".cache", "jobs"))
+JOB_WORKERS    = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RETENTION  = int(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))  # seconds
+
+ACTIVE_STATES = ("queued", "running")
+JOB_ID_RE     = re.compile(r"[0-9a-f]{12}-[0-9a-f]{6}")
+
+
+def job_key(params: dict) -> str:
+    """Hash of the parameters that define a generation; equal keys coalesce."""
+    normalized = {**params, "topic": " ".join(params["topic"].lower().split())}
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def run_generation(params: dict, progress) -> dict:
+    """Run one generation and return its JSON-serializable result.
+
+    `params` holds topic, num_slides, theme, output ("google" or "pptx"),
+    use_images, use_cache, image_url and draft, plus an optional
+    google_user whose credentials and quota the deck is created with.
+    `progress(message)` is called as slides arrive.
+    """
+    topic      = params["topic"]
+    on_slide   = lambda n, slide: progress(f"✍️ Slide {n}: {slide.title}")
+    draft      = params.get("draft", False)
+    from_cache = params["use_cache"] and is_outline_cached(topic, params["num_slides"], draft)
+    link = pptx_path = None
+
+    with as_user(params.get("google_user")), trace("generation") as gen_trace:
+        if params["output"] == "pptx":
+            t1 = time.time()
+            outline = build_outline(topic, num_slides=params["num_slides"], use_cache=params["use_cache"],
+                                    on_slide=on_slide, draft=draft)
+            t2 = time.time()
+            progress("🎨 Rendering .pptx...")
+            with span("pptx.render"):
+                pptx_path = PptxBackend().render(
+                    outline,
+                    THEME_STYLES[params["theme"]],
+                    image_url=params["image_url"],
+                    use_images=params["use_images"],
+                )
+            t3 = time.time()
+            timings = {"research": round(t2 - t1, 1), "total": round(t3 - t1, 1)}
+        else:
+            link, outline, timings = generate_presentation(
+                topic,
+                num_slides=params["num_slides"],
+                theme=params["theme"],
+                image_url=params["image_url"],
+                use_images=params["use_images"],
+                use_cache=params["use_cache"],
+                on_slide=on_slide,
+                draft=draft,
+            )
+
+    return {
+        "link":       link,
+        "pptx_path":  pptx_path,
+        "outline":    outline.model_dump(),
+        "timings":    timings,
+        "from_cache": from_cache,
+        "trace": {
+            "trace_id": gen_trace.trace_id,
+            "summary":  gen_trace.summary(),
+            "spans":    gen_trace.to_dicts(),
+        },
+    }
+
+
+class JobManager:
+    """Runs generations on a local thread pool and persists their state.
+
+    Jobs are I/O bound (Groq, Pexels and Google calls), so threads are
+    enough and they share the process-wide caches, rate limiters and the
+    Google quota scheduler. Submitting parameters identical to a job that
+    is still queued or running returns that job's ID instead of starting
+    another generation.
+    """
+
+    def __init__(self, jobs_dir: str = JOBS_DIR, workers: int = JOB_WORKERS, runner=run_generation):
+        self.jobs_dir = jobs_dir
+        self.runner   = runner
+        self._pool    = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs    = {}   # job_id -> state, while queued or running in this process
+        self._active  = {}   # job_key -> job_id while queued or running
+        self._lock    = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._prune()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: dict) -> bool:
+        with self._lock:
+            payload = json.dumps(job)
+        try:
+            write_atomic(self._path(job["id"]), payload)
+            return True
+        except OSError as e:
+            print(f"⚠️  Could not persist job {job['id']}: {e}")
+            return False
+
+    def _update(self, job: dict, **changes) -> bool:
+        with self._lock:
+            job.update(changes)
+            job["updated_at"] = time.time()
+        return self._save(job)
+
+    @staticmethod
+    def _pptx_path(job_path: str):
+        try:
+            with open(job_path, encoding="utf-8") as f:
+                return ((json.load(f).get("result") or {}).get("pptx_path"))
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _prune(self):
+        """Delete job files older than JOB_RETENTION and the .pptx files
+        those jobs rendered."""
+        cutoff = time.time() - JOB_RETENTION
+        for name in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                pptx_path = self._pptx_path(path) if name.endswith(".json") else None
+                os.remove(path)
+                if pptx_path and os.path.exists(pptx_path):
+                    os.remove(pptx_path)
+            except OSError:
+                pass
+
+    def submit(self, params: dict) -> str:
+        key = job_key(params)
+        with self._lock:
+            existing = self._active.get(key)
+            if existing is not None:
+                return existing
+            job_id = f"{key[:12]}-{secrets.token_hex(3)}"
+            job = {
+                "id":          job_id,
+                "key":         key,
+                "params":      params,
+                "status":      "queued",
+                "progress":    [],
+                "result":      None,
+                "error":       None,
+                "created_at":  time.time(),
+                "started_at":  None,
+                "finished_at": None,
+                "updated_at":  time.time(),
+            }
+            self._jobs[job_id] = job
+            self._active[key]  = job_id
+        self._save(job)
+        self._pool.submit(self._run, job)
+        return job_id
+
+    def _run(self, job: dict):
+        self._update(job, status="running", started_at=time.time())
+
+        def progress(message: str):
+            with self._lock:
+                job["progress"].append(message)
+            self._update(job)
+
+        persisted = False
+        try:
+            result = self.runner(job["params"], progress)
+            persisted = self._update(job, status="done", result=result, finished_at=time.time())
+        except Exception as e:
+            persisted = self._update(job, status="error", error=f"{type(e).__name__}: {e}",
+                                     finished_at=time.time())
+        finally:
+            with self._lock:
+                self._active.pop(job["key"], None)
+                if persisted:
+                    self._jobs.pop(job["id"], None)   # get() reads finished jobs from disk
+
+    def update_result(self, job_id: str, **changes):
+        """Merge `changes` into a finished job's result, e.g. the outline
+        after a slide was regenerated, so later page loads show it."""
+        job = self.get(job_id)
+        if job is None or job["status"] != "done":
+            return
+        with self._lock:
+            job = self._jobs.get(job_id, job)   # still in memory only if persisting it failed
+            job["result"].update(changes)
+        self._update(job)
+
+    def get(self, job_id: str):
+        """Snapshot of a job's state, or None if the ID is unknown."""
+        if not job_id or not JOB_ID_RE.fullmatch(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job["status"] in ACTIVE_STATES:
+            # Persisted as in flight but not running here: the process that
+            # owned it has exited
+            job["status"] = "error"
+            job["error"]  = "Interrupted by a server restart, please generate again"
+        return job
+
+
+job_manager = JobManager()
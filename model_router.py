@@ -0,0 +1,174 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+from atomic_file import write_atomic
+
+QUALITY_MODEL         = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+FAST_MODEL            = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
+FAST_MODEL_MAX_SLIDES = int(os.getenv("FAST_MODEL_MAX_SLIDES", "5"))   # decks this small use the fast tier
+MODEL_STATS_PATH      = os.getenv("MODEL_STATS_PATH", os.path.join(".cache", "model_stats.json"))
+
+MAX_COMPLETION_TOKENS    = 8000   # upper bound for any outline call
+MIN_COMPLETION_TOKENS    = 1024
+DEFAULT_TOKENS_PER_SLIDE = 330    # 4-5 bullets of 15-25 words + 2-3 sentence notes + JSON keys
+TOKEN_HEADROOM           = 1.3    # margin over the estimate before a response would be cut off
+STATS_SAMPLES            = 200    # most recent calls kept per model
+
+Route = namedtuple("Route", ["model", "max_tokens", "tier"])
+
+
+class ModelStats:
+    """Recent token counts and speed per model, persisted as JSON.
+
+    Every outline completion records its prompt/completion tokens, slide
+    count and generation time. The observed tokens per slide then replace
+    the built-in estimate when budgeting max_tokens.
+    """
+
+    def __init__(self, path: str = MODEL_STATS_PATH, max_samples: int = STATS_SAMPLES):
+        self.path        = path
+        self.max_samples = max_samples
+        self._lock       = threading.Lock()
+        self._samples    = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            write_atomic(self.path, json.dumps(self._samples))
+        except OSError as e:
+            print(f"⚠️  Could not save model stats: {e}")
+
+    def record(self, model: str, num_slides, prompt_tokens, completion_tokens, seconds: float,
+               first_token_s: float = None, total_s: float = None, purpose: str = "outline"):
+        if not completion_tokens:
+            return
+        sample = {
+            "at":                round(time.time()),
+            "num_slides":        num_slides,
+            "prompt_tokens":     prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "seconds":           round(seconds, 3),
+            "tokens_per_second": round(completion_tokens / seconds, 1) if seconds > 0 else None,
+            "first_token_s":     round(first_token_s, 3) if first_token_s is not None else None,
+            "total_s":           round(total_s, 3) if total_s is not None else None,
+            "purpose":           purpose,   # outline, section, missing_slides, slide, section_plan
+        }
+        with self._lock:
+            samples = self._samples.setdefault(model, [])
+            samples.append(sample)
+            del samples[:-self.max_samples]
+            self._save()
+
+    def tokens_per_slide(self, model: str, quantile: float = 0.9, min_samples: int = 3):
+        """Observed completion tokens per slide at `quantile`, or None
+        until enough calls have been recorded."""
+        with self._lock:
+            ratios = sorted(
+                s["completion_tokens"] / s["num_slides"]
+                for s in self._samples.get(model, []) if s.get("num_slides")
+            )
+        if len(ratios) < min_samples:
+            return None
+        return ratios[min(len(ratios) - 1, int(quantile * len(ratios)))]
+
+    def latency(self, model: str, num_slides: int, quantile: float = 0.9, min_samples: int = 5):
+        """{"first_token_s", "total_s"} at `quantile` for an outline of
+        `num_slides` slides, or None until enough calls have been recorded.
+        Only full-outline calls count: single-slide and follow-up calls
+        carry the same fixed overhead over far fewer slides. Total time is
+        scaled from the observed seconds per slide; first_token_s is None
+        if no streamed calls were recorded."""
+        with self._lock:
+            samples = [s for s in self._samples.get(model, [])
+                       if s.get("purpose") == "outline" and s.get("total_s") and s.get("num_slides")]
+        if len(samples) < min_samples:
+            return None
+
+        def at_quantile(values):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(quantile * len(values)))] if values else None
+
+        return {
+            "first_token_s": at_quantile(s["first_token_s"] for s in samples if s.get("first_token_s") is not None),
+            "total_s":       at_quantile(s["total_s"] / s["num_slides"] for s in samples) * num_slides,
+        }
+
+    def summary(self) -> dict:
+        """{model: calls, avg tokens/s, median tokens/slide, avg prompt tokens}"""
+        with self._lock:
+            samples = {model: list(entries) for model, entries in self._samples.items()}
+        summary = {}
+        for model, entries in samples.items():
+            speeds = [s["tokens_per_second"] for s in entries if s.get("tokens_per_second")]
+            per_slide = sorted(s["completion_tokens"] / s["num_slides"] for s in entries if s.get("num_slides"))
+            prompts = [s["prompt_tokens"] for s in entries if s.get("prompt_tokens")]
+            summary[model] = {
+                "calls":                 len(entries),
+                "avg_tokens_per_second": round(sum(speeds) / len(speeds), 1) if speeds else None,
+                "p50_tokens_per_slide":  round(per_slide[len(per_slide) // 2]) if per_slide else None,
+                "avg_prompt_tokens":     round(sum(prompts) / len(prompts)) if prompts else None,
+            }
+        return summary
+
+
+model_stats = ModelStats()
+
+
+class HedgeStats:
+    """Process-wide counters for hedged outline requests."""
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._counts = {"requests": 0, "hedges_fired": 0, "hedge_wins": 0, "saved_s": 0.0}
+
+    def record(self, fired: bool, hedge_won: bool, saved_s: float = 0.0):
+        with self._lock:
+            self._counts["requests"]     += 1
+            self._counts["hedges_fired"] += int(fired)
+            self._counts["hedge_wins"]   += int(hedge_won)
+            self._counts["saved_s"]      += max(0.0, saved_s)
+
+    def summary(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["saved_s"]   = round(counts["saved_s"], 1)
+        counts["fire_rate"] = round(counts["hedges_fired"] / counts["requests"], 3) if counts["requests"] else 0.0
+        return counts
+
+
+hedge_stats = HedgeStats()
+
+
+def budget_tokens(model: str, num_slides: int) -> int:
+    """max_tokens for an outline of `num_slides` slides on `model`."""
+    per_slide = model_stats.tokens_per_slide(model) or DEFAULT_TOKENS_PER_SLIDE
+    estimate  = math.ceil(num_slides * per_slide * TOKEN_HEADROOM) + 150   # + topic and JSON wrapper
+    return max(MIN_COMPLETION_TOKENS, min(MAX_COMPLETION_TOKENS, estimate))
+
+
+def route(num_slides: int, draft: bool = False) -> Route:
+    """Model and token budget for an outline request.
+
+    Drafts and decks of up to FAST_MODEL_MAX_SLIDES slides go to the fast
+    tier; everything else gets the quality model.
+    """
+    fast  = draft or num_slides <= FAST_MODEL_MAX_SLIDES
+    model = FAST_MODEL if fast else QUALITY_MODEL
+    return Route(model, budget_tokens(model, num_slides), "fast" if fast else "quality")
+
+
+if __name__ == "__main__":
+    for model, entry in model_stats.summary().items():
+        print(f"🤖 {model}: {entry}")
+    for n in (5, 8, 15):
+        print(f"📐 {n} slides → {route(n)}")
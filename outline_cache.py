@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from atomic_file import write_atomic
+from models import PresentationOutline
+
+OUTLINE_CACHE_DIR       = os.getenv("OUTLINE_CACHE_DIR", os.path.join(".cache", "outlines"))
+OUTLINE_CACHE_MAX_BYTES = int(os.getenv("OUTLINE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def outline_cache_key(topic: str, num_slides: int, model: str, temperature: float, prompt_template: str) -> str:
+    """Content hash of everything that determines what the LLM is asked for."""
+    payload = json.dumps({
+        "topic":       " ".join(topic.lower().split()),
+        "num_slides":  num_slides,
+        "model":       model,
+        "temperature": temperature,
+        "template":    hashlib.sha256(prompt_template.encode("utf-8")).hexdigest(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class OutlineCache:
+    """Directory of validated PresentationOutline JSON files, one per key.
+
+    Files are written atomically (temp file + rename) so concurrent readers
+    never see partial JSON. Once the directory grows past `max_bytes` the
+    least recently used files are removed.
+    """
+
+    def __init__(self, directory: str = OUTLINE_CACHE_DIR, max_bytes: int = OUTLINE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                outline = PresentationOutline(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Dropping unreadable cached outline {key[:12]}: {e}")
+            self.delete(key)
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return outline
+
+    def set(self, key: str, outline: PresentationOutline):
+        write_atomic(self._path(key), outline.model_dump_json())
+        self.evict()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,132 @@
+import json
+
+
+def strip_code_fences(raw: str) -> str:
+    """Remove the ```json ... ``` wrapper the model sometimes adds."""
+    raw = raw.strip()
+    if raw.startswith("```json"):
+        raw = raw[7:]
+    if raw.startswith("```"):
+        raw = raw[3:]
+    if raw.endswith("```"):
+        raw = raw[:-3]
+    return raw.strip()
+
+
+class SlideStreamParser:
+    """Incremental scanner over a streamed outline JSON document.
+
+    `feed` takes the next chunk of model output and returns the dicts of
+    every slide object inside the top-level "slides" array that closed in
+    that chunk. Each character is scanned once; only string/escape state,
+    the bracket stack and the current key per depth are tracked, so no
+    partial JSON is ever re-parsed. Text before the first "{" (code fences,
+    stray prose) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.topic  = None
+        self._pos   = 0
+        self._stack = []
+        self._keys  = {}             # depth -> most recent key at that depth
+        self._in_string    = False
+        self._escape       = False
+        self._string_start = 0
+        self._last_string  = None    # raw JSON of a string that may turn out to be a key
+        self._after_colon  = False
+        self._slides_depth = None    # depth of the "slides" array once opened
+        self._slide_start  = None    # buffer offset of the slide object being read
+
+    def feed(self, text: str) -> list[dict]:
+        self.buffer += text
+        buf       = self.buffer
+        completed = []
+
+        for pos in range(self._pos, len(buf)):
+            ch = buf[pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string(buf[self._string_start:pos + 1])
+                continue
+
+            if not self._stack and ch != "{":
+                continue
+            if ch.isspace():
+                continue
+
+            if ch == '"':
+                self._in_string    = True
+                self._string_start = pos
+                continue
+
+            if ch == ":" and self._last_string is not None:
+                self._keys[len(self._stack)] = json.loads(self._last_string)
+                self._after_colon = True
+            elif ch in "{[":
+                self._stack.append(ch)
+                depth = len(self._stack)
+                if ch == "[" and depth == 2 and self._keys.get(1) == "slides":
+                    self._slides_depth = depth
+                elif ch == "{" and self._slides_depth and depth == self._slides_depth + 1:
+                    self._slide_start = pos
+                self._after_colon = False
+            elif ch in "}]":
+                depth = len(self._stack)
+                if ch == "}" and self._slide_start is not None and depth == self._slides_depth + 1:
+                    try:
+                        completed.append(json.loads(buf[self._slide_start:pos + 1]))
+                    except json.JSONDecodeError as e:
+                        print(f"⚠️  Skipping unparseable streamed slide: {e}")
+                    self._slide_start = None
+                elif ch == "]" and depth == self._slides_depth:
+                    self._slides_depth = None
+                if self._stack:
+                    self._stack.pop()
+                self._after_colon = False
+            else:
+                self._after_colon = False
+            self._last_string = None
+
+        self._pos = len(buf)
+        return completed
+
+    def _on_string(self, raw: str):
+        if self._after_colon and len(self._stack) == 1 and self._keys.get(1) == "topic":
+            self.topic = json.loads(raw)
+        self._after_colon = False
+        self._last_string = raw
+
+
+def recover_outline(raw: str) -> dict:
+    """Best-effort {"topic", "slides"} from model output that isn't valid JSON.
+
+    Prose around the object is dropped first. If the object itself is
+    truncated or malformed, the slides array is scanned instead and every
+    slide object that closed is kept, which drops an incomplete trailing
+    slide and closes the arrays and objects left open after it. "slides"
+    holds raw dicts; validating them is up to the caller.
+    """
+    raw = strip_code_fences(raw)
+    start, end = raw.find("{"), raw.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(raw[start:end + 1])
+            if isinstance(data, dict) and isinstance(data.get("slides"), list):
+                return {
+                    "topic":  data.get("topic") if isinstance(data.get("topic"), str) else None,
+                    "slides": [s for s in data["slides"] if isinstance(s, dict)],
+                }
+        except json.JSONDecodeError:
+            pass
+
+    parser = SlideStreamParser()
+    slides = parser.feed(raw)
+    topic  = parser.topic if isinstance(parser.topic, str) else None
+    return {"topic": topic, "slides": [s for s in slides if isinstance(s, dict)]}
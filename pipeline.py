@@ -0,0 +1,162 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from google_auth import get_services
+from image_search import find_image_url, IMAGE_WORKERS
+from models import PresentationOutline
+from research_agent import build_outline, generate_slide
+from tracing import span, submit
+from slides_generator import (
+    THEME_STYLES,
+    provision_presentation,
+    load_speaker_notes_ids,
+    populate_presentation,
+    share_presentation,
+    discard_presentation,
+    patch_slide,
+)
+
+
+def generate_presentation(
+    topic: str,
+    num_slides: int = 8,
+    theme: str = "Default (No Theme)",
+    image_url: str = "",
+    use_images: bool = True,
+    use_cache: bool = True,
+    image_workers: int = IMAGE_WORKERS,
+    on_slide=None,
+    draft: bool = False,
+):
+    """Research and build a deck with the independent phases overlapped.
+
+    Google auth and deck provisioning only need the slide count, so they
+    start on a background thread while the outline streams in. Each slide's
+    image lookup is submitted the moment that slide arrives. Once research
+    finishes we join both and fill the deck, so wall time is roughly
+    max(research, provisioning) + populate instead of the sum.
+
+    A provisioning failure (e.g. CredentialsRequired) is raised as soon as
+    it happens rather than after research; if research fails instead, the
+    already provisioned deck is deleted from Drive.
+
+    Returns (link, outline, timings) where timings holds seconds per phase
+    plus the number of Google API calls made.
+    """
+    timings = {}
+    stats   = Counter()
+    styles  = THEME_STYLES.get(theme, THEME_STYLES["Default (No Theme)"])
+    t_start = time.time()
+
+    def provision():
+        t0 = time.time()
+        with span("pipeline.provision", num_slides=num_slides):
+            slides_service, drive_service = get_services()
+            deck = provision_presentation(slides_service, topic, num_slides, stats=stats,
+                                          drive_service=drive_service, styles=styles)
+            load_speaker_notes_ids(slides_service, deck, stats=stats)
+        timings["provisioning"] = round(time.time() - t0, 1)
+        return slides_service, drive_service, deck
+
+    def research():
+        with span("pipeline.research"):
+            return build_outline(topic, num_slides=num_slides, use_cache=use_cache, on_slide=handle_slide,
+                                 draft=draft)
+
+    def provisioning_failed() -> bool:
+        return deck_future.done() and deck_future.exception() is not None
+
+    def handle_slide(index, slide):
+        if provisioning_failed():
+            raise RuntimeError("deck provisioning failed; abandoning research")   # stops the stream
+        query = slide.image_query
+        if use_images and query and slide.table is None and query not in image_futures:
+            image_futures[query] = submit(image_pool, find_image_url, query)
+        if on_slide:
+            on_slide(index, slide)
+
+    # Research runs on its own thread so a provisioning failure can end the
+    # run without waiting for it; that pool is never joined
+    research_pool = ThreadPoolExecutor(max_workers=1)
+    with ThreadPoolExecutor(max_workers=1) as provision_pool, \
+         ThreadPoolExecutor(max_workers=max(1, image_workers)) as image_pool:
+        deck_future     = submit(provision_pool, provision)
+        image_futures   = {}
+        research_future = submit(research_pool, research)
+        research_pool.shutdown(wait=False)
+
+        wait([deck_future, research_future], return_when=FIRST_EXCEPTION)
+        if provisioning_failed():
+            raise deck_future.exception()
+        try:
+            outline = research_future.result()
+        except Exception:
+            if deck_future.exception() is None:
+                _, drive_service, deck = deck_future.result()
+                discard_presentation(drive_service, deck["presentation_id"], stats=stats)
+            raise
+        t_research = time.time()
+        timings["research"] = round(t_research - t_start, 1)
+
+        with span("pipeline.join"):
+            slides_service, drive_service, deck = deck_future.result()
+            image_urls = {query: future.result() for query, future in image_futures.items()}
+        timings["join_wait"] = round(time.time() - t_research, 1)
+
+    t_populate = time.time()
+    with span("pipeline.populate", slides=len(outline.slides)):
+        populate_presentation(
+            slides_service,
+            deck,
+            outline,
+            theme=theme,
+            image_url=image_url,
+            use_images=use_images,
+            image_workers=image_workers,
+            image_urls=image_urls,
+            stats=stats,
+            styles=styles,
+        )
+        link = share_presentation(drive_service, deck["presentation_id"], stats=stats)
+    timings["populate"]  = round(time.time() - t_populate, 1)
+    timings["total"]     = round(time.time() - t_start, 1)
+    timings["api_calls"] = sum(stats.values())
+    return link, outline, timings
+
+
+def regenerate_slide(
+    presentation_id: str,
+    outline: PresentationOutline,
+    index: int,
+    theme: str = "Default (No Theme)",
+    use_images: bool = True,
+    instructions: str = "",
+    draft: bool = False,
+):
+    """Rewrite content slide `index` (1-based) of an existing deck and patch
+    just that slide in place instead of rebuilding the presentation.
+
+    Returns (outline, changes): the outline with the new slide swapped in
+    and the parts of the slide that changed.
+    """
+    with span("slide.regenerate", index=index):
+        new_slide = generate_slide(outline, index, instructions=instructions, draft=draft)
+        slides_service, _ = get_services()
+        changes = patch_slide(
+            slides_service,
+            presentation_id,
+            index,
+            outline.slides[index - 1],
+            new_slide,
+            theme=theme,
+            use_images=use_images,
+        )
+    slides = list(outline.slides)
+    slides[index - 1] = new_slide
+    return outline.model_copy(update={"slides": slides}), changes
+
+
+if __name__ == "__main__":
+    link, outline, timings = generate_presentation("Artificial Intelligence", num_slides=8, theme="Dark")
+    print(f"\n✅ Presentation created: {link}")
+    print(timings)
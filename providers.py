@@ -0,0 +1,102 @@
+"""Lazily built, process-wide clients.
+
+Heavy SDKs (groq, googleapiclient, requests) are only imported, and local
+stores (the SQLite image cache) only opened, when a provider is first
+asked for, so importing the app or a CLI module stays cheap. Tests and
+benchmarks swap a provider for a stand-in with `override`.
+"""
+import os
+import threading
+
+_lock      = threading.Lock()   # guards the dicts below, never held while a factory runs
+_factories = {}
+_instances = {}
+_building  = {}                 # name -> lock held while that provider is being built
+_env_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ once per process."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+def register(name: str, factory):
+    """Build `name` with `factory()` the first time it's requested."""
+    with _lock:
+        _factories[name] = factory
+
+
+def get(name: str):
+    """The shared instance of `name`, built on first use. Factories run
+    under a per-name lock only, so one may use other providers and a slow
+    one does not hold up the rest."""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        factory = _factories[name]
+        build   = _building.setdefault(name, threading.Lock())
+    with build:
+        instance = _instances.get(name)
+        if instance is None:
+            instance = factory()
+            with _lock:
+                instance = _instances.setdefault(name, instance)   # an override may have landed meanwhile
+    return instance
+
+
+def override(name: str, instance):
+    """Use `instance` for `name` from now on (e.g. a fake client)."""
+    with _lock:
+        _instances[name] = instance
+
+
+def reset(name: str):
+    """Drop the built instance so the next `get` rebuilds it."""
+    with _lock:
+        _instances.pop(name, None)
+
+
+def _groq():
+    from groq import Groq
+    load_env()
+    return Groq(api_key=os.environ.get("GROQ_API_KEY"))
+
+
+def _credentials():
+    from credential_store import CredentialStore
+    return CredentialStore()
+
+
+def _google():
+    from google_auth import ServiceProvider
+    return ServiceProvider()
+
+
+def _image_cache():
+    from image_cache import ImageCache
+    return ImageCache()
+
+
+def _http():
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=int(os.getenv("IMAGE_WORKERS", "6")))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+register("groq", _groq)                # groq.Groq
+register("credentials", _credentials)  # credential_store.CredentialStore
+register("google", _google)            # google_auth.ServiceProvider
+register("http", _http)                # requests.Session for plain, unauthenticated fetches
+register("image_cache", _image_cache)  # image_cache.ImageCache
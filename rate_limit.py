@@ -0,0 +1,67 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`.
+
+    Callers block in `acquire` until a token is free (or the timeout runs
+    out) instead of firing requests the upstream API would reject.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate     = rate
+        self.capacity = capacity
+        self._tokens  = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock    = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens  = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self, now: float) -> float:
+        """Seconds until a token is available; takes it if one is free now."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now  = time.monotonic()
+                wait = self._wait_time(now)
+            if wait == 0:
+                return True
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause_until(self, monotonic_ts: float):
+        """Hold every caller until `monotonic_ts`, e.g. after a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, monotonic_ts)
+            self._tokens = 0
+
+    def limit_tokens(self, remaining: float):
+        """Clamp the local budget to what the server says is left."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, remaining)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
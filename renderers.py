@@ -0,0 +1,206 @@
+import os
+from abc import ABC, abstractmethod
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from models import PresentationOutline
+import providers
+from image_search import find_image_urls, IMAGE_WORKERS
+from slides_generator import (
+    create_presentation, THEME_STYLES, SLIDE_WIDTH_EMU, SLIDE_HEIGHT_EMU,
+    IMAGE_W, IMAGE_H, IMAGE_X, IMAGE_Y, HERO_W, HERO_H, HERO_X, HERO_Y,
+)
+
+PPTX_OUTPUT_DIR = os.getenv("PPTX_OUTPUT_DIR", "output")
+
+
+class RenderBackend(ABC):
+    """Turns a PresentationOutline plus a THEME_STYLES entry into a deck.
+
+    `render` returns where the deck ended up: a URL for remote backends,
+    a file path for local ones.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def render(
+        self,
+        outline: PresentationOutline,
+        styles: dict,
+        image_url: str = "",
+        use_images: bool = True,
+        image_urls: dict = None,
+    ) -> str:
+        ...
+
+
+# ── Google Slides ─────────────────────────────────────────────────────────────
+class GoogleSlidesBackend(RenderBackend):
+    name = "google"
+
+    def render(self, outline, styles, image_url="", use_images=True, image_urls=None) -> str:
+        return create_presentation(
+            outline,
+            styles=styles,
+            image_url=image_url,
+            use_images=use_images,
+            image_urls=image_urls,
+        )
+
+
+# ── Local .pptx ───────────────────────────────────────────────────────────────
+def _rgb(color: dict):
+    from pptx.dml.color import RGBColor
+    return RGBColor(*(round(color[c] * 255) for c in ("red", "green", "blue")))
+
+
+def _style_runs(text_frame, size_pt: int, color: dict, bold: bool = False):
+    from pptx.util import Pt
+    for paragraph in text_frame.paragraphs:
+        for run in paragraph.runs:
+            run.font.size      = Pt(size_pt)
+            run.font.bold      = bold
+            run.font.color.rgb = _rgb(color)
+
+
+def _download_image(url: str):
+    try:
+        response = providers.get("http").get(url, timeout=10)
+        response.raise_for_status()
+        return BytesIO(response.content)
+    except Exception as e:
+        print(f"  ⚠️  Could not download image {url}: {e}")
+        return None
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60] or "presentation"
+
+
+class PptxBackend(RenderBackend):
+    """Writes a .pptx file with python-pptx; no Google account or API calls.
+
+    Images are still fetched from Pexels when `use_images` is on. With
+    images off (or pre-resolved `image_urls`) the render is fully local.
+    """
+
+    name = "pptx"
+
+    def __init__(self, output_dir: str = PPTX_OUTPUT_DIR, image_workers: int = IMAGE_WORKERS):
+        self.output_dir    = output_dir
+        self.image_workers = image_workers
+
+    def _fetch_images(self, outline, image_url, use_images, image_urls) -> dict:
+        urls = {}
+        if use_images:
+            queries = [s.image_query for s in outline.slides if s.image_query and s.table is None]
+            resolved = dict(image_urls or {})
+            resolved.update(find_image_urls([q for q in queries if q not in resolved], self.image_workers))
+            urls.update({q: u for q, u in resolved.items() if u})
+        if image_url.strip():
+            urls["__hero__"] = image_url.strip()
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.image_workers, len(urls)))) as pool:
+            images = dict(zip(urls, pool.map(_download_image, urls.values())))
+        return {key: data for key, data in images.items() if data}
+
+    def render(self, outline, styles, image_url="", use_images=True, image_urls=None) -> str:
+        try:
+            from pptx import Presentation
+            from pptx.util import Emu
+        except ImportError as e:
+            raise RuntimeError("The .pptx backend needs python-pptx: pip install python-pptx") from e
+
+        images = self._fetch_images(outline, image_url, use_images, image_urls)
+
+        prs = Presentation()
+        prs.slide_width  = Emu(SLIDE_WIDTH_EMU)
+        prs.slide_height = Emu(SLIDE_HEIGHT_EMU)
+        title_layout, body_layout = prs.slide_layouts[0], prs.slide_layouts[1]
+
+        def new_slide(layout):
+            slide = prs.slides.add_slide(layout)
+            if styles.get("background_color"):
+                slide.background.fill.solid()
+                slide.background.fill.fore_color.rgb = _rgb(styles["background_color"])
+            return slide
+
+        # Title slide
+        slide = new_slide(title_layout)
+        slide.shapes.title.text = outline.topic
+        _style_runs(slide.shapes.title.text_frame, 38, styles["title_color"], bold=True)
+        slide.placeholders[1].text = "AI-Generated Presentation"
+        if "__hero__" in images:
+            slide.shapes.add_picture(images["__hero__"], Emu(HERO_X), Emu(HERO_Y), Emu(HERO_W), Emu(HERO_H))
+
+        # Content slides
+        for i, content in enumerate(outline.slides, start=1):
+            slide = new_slide(body_layout)
+            slide.shapes.title.text = content.title
+            _style_runs(slide.shapes.title.text_frame, 24, styles["title_color"], bold=True)
+            body = slide.placeholders[1]
+
+            if content.table is not None:
+                body._element.getparent().remove(body._element)
+                self._add_table(slide, content.table, styles)
+                print(f"  📊 Table added to slide {i}: {content.title}")
+            else:
+                body.text_frame.text = "\n".join(content.bullets)
+                _style_runs(body.text_frame, 14, styles["body_color"])
+                image = images.get(content.image_query) if use_images else None
+                if image:
+                    body.width = Emu(int(SLIDE_WIDTH_EMU * 0.50))
+                    slide.shapes.add_picture(image, Emu(IMAGE_X), Emu(IMAGE_Y), Emu(IMAGE_W), Emu(IMAGE_H))
+
+            if content.notes:
+                slide.notes_slide.notes_text_frame.text = content.notes
+
+        # Random suffix: two renders of the same topic (e.g. in two themes) must not share a file
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{_slug(outline.topic)}-{secrets.token_hex(3)}.pptx")
+        prs.save(path)
+        print(f"\n✅ Presentation saved: {path}")
+        return path
+
+    @staticmethod
+    def _add_table(slide, table_data, styles):
+        from pptx.util import Emu
+        headers = [str(h) for h in table_data.headers]
+        rows    = [[str(c) for c in row] for row in table_data.rows]
+        shape = slide.shapes.add_table(
+            len(rows) + 1, len(headers), Emu(457200), Emu(1800000), Emu(8200000), Emu(3200000)
+        )
+        table = shape.table
+        for col, header in enumerate(headers):
+            cell = table.cell(0, col)
+            cell.text = header
+            cell.fill.solid()
+            cell.fill.fore_color.rgb = _rgb(styles["table_header_color"])
+            _style_runs(cell.text_frame, 14, {"red": 1.0, "green": 1.0, "blue": 1.0}, bold=True)
+        for r, row in enumerate(rows, start=1):
+            for col, value in enumerate(row[:len(headers)]):
+                cell = table.cell(r, col)
+                cell.text = value
+                _style_runs(cell.text_frame, 11, styles["table_body_text_color"])
+
+
+BACKENDS = {
+    GoogleSlidesBackend.name: GoogleSlidesBackend,
+    PptxBackend.name:         PptxBackend,
+}
+
+
+def render_presentation(outline: PresentationOutline, theme: str = "Default (No Theme)",
+                        backend: str = "google", **kwargs) -> str:
+    styles = THEME_STYLES.get(theme, THEME_STYLES["Default (No Theme)"])
+    return BACKENDS[backend]().render(outline, styles, **kwargs)
+
+
+if __name__ == "__main__":
+    from research_agent import build_outline
+    outline = build_outline("Artificial Intelligence")
+    path = render_presentation(outline, theme="Dark", backend="pptx", use_images=False)
+    print(f"\n✅ Presentation created: {path}")
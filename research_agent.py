@@ -1,16 +1,44 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
+import math
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pydantic import ValidationError
 from models import SlideContent, PresentationOutline
+from outline_cache import OutlineCache, outline_cache_key
+from outline_parser import SlideStreamParser, strip_code_fences, recover_outline
+from tracing import span, submit
+from model_router import route, budget_tokens, model_stats, hedge_stats
+import providers
 
-load_dotenv()
+providers.load_env()
 
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+outline_cache = OutlineCache()
 
+TEMPERATURE = 0.7
 
-def build_outline(topic: str, num_slides: int = 8) -> PresentationOutline:
-    prompt = f"""
+# Decks longer than LARGE_DECK_SLIDES are planned as sections of about
+# OUTLINE_SECTION_SIZE slides that are generated concurrently
+LARGE_DECK_SLIDES       = int(os.getenv("LARGE_DECK_SLIDES", "15"))
+OUTLINE_SECTION_SIZE    = int(os.getenv("OUTLINE_SECTION_SIZE", "8"))
+OUTLINE_SECTION_WORKERS = int(os.getenv("OUTLINE_SECTION_WORKERS", "6"))
+PLAN_MAX_TOKENS         = 1500
+
+# Hedged outline requests: if the first request has no tokens (or, when not
+# streaming, no outline) by the HEDGE_QUANTILE latency seen for its model,
+# a second one goes out and the first usable answer wins
+HEDGE_OUTLINES      = os.getenv("HEDGE_OUTLINES", "0") == "1"
+HEDGE_QUANTILE      = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MODEL         = os.getenv("HEDGE_MODEL", "")                      # empty = same model as the first request
+HEDGE_FIRST_TOKEN_S = float(os.getenv("HEDGE_FIRST_TOKEN_S", "3.0"))    # deadline until enough calls are recorded
+
+SYSTEM_PROMPT = "You are a research assistant that generates comprehensive, detailed slide content. Always return pure JSON."
+
+OUTLINE_PROMPT = """
 Research the topic '{topic}' deeply and return a comprehensive, detailed JSON object with this exact structure:
 
 {{
@@ -55,39 +83,698 @@ Research the topic '{topic}' deeply and return a comprehensive, detailed JSON ob
 - Return ONLY valid JSON, no markdown, no explanations
 """
 
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a research assistant that generates comprehensive, detailed slide content. Always return pure JSON.",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        model="llama-3.3-70b-versatile",
-        temperature=0.7,
-        max_tokens=8000,
-    )
+MISSING_SLIDES_PROMPT = """
+Your previous answer was cut off or incomplete. The presentation so far has these slides:
+{titles}
+
+Return ONLY a JSON object {{"slides": [...]}} with the {count} remaining slides that follow them,
+using the same slide structure and rules. Do not repeat any of the slides above.
+"""
+
+
+SECTION_PLAN_PROMPT = """
+Plan a presentation on '{topic}' with {num_slides} slides split into EXACTLY {num_sections} sections
+that together cover the topic from introduction to conclusion without overlapping.
+
+Return ONLY a JSON object with this structure, no markdown, no explanations:
+{{
+  "topic": "Main Topic Title",
+  "sections": [
+    {{"title": "Section title", "focus": "One sentence on what this section covers"}}
+  ]
+}}
+"""
+
+SECTION_PROMPT = """
+This request is section {index} of {total} of a presentation on '{topic}'.
+Section: {title} — {focus}
+The other sections are covered separately, so stay within this section and do not repeat them:
+{others}
+"""
+
+SLIDE_PROMPT = """
+This request regenerates slide {index} of {total} of a presentation on '{topic}'.
+The deck's slides are:
+{titles}
+
+The current slide {index} is:
+{current}
+
+{instructions}
+
+Return ONLY a JSON object for the replacement slide, no markdown, no explanations:
+{{"title": "...", "bullets": ["..."], "notes": "...", "image_query": "...", "table": null}}
+
+**STRICT RULES:**
+- Each bullet must be 15-25 words long — comprehensive and detailed
+- Speaker notes must be 2-3 full sentences with extra context
+- A table slide has "table": {{"headers": [...], "rows": [[...]]}}, an empty bullets array and no image_query
+- A non-table slide must have 4-5 detailed bullets
+"""
+
+DEFAULT_SLIDE_INSTRUCTIONS = "Write a fresh version of this slide that fits between its neighbours without repeating them."
+
+
+def _cache_key(topic: str, num_slides: int, draft: bool = False) -> str:
+    template = SYSTEM_PROMPT + OUTLINE_PROMPT
+    if num_slides > LARGE_DECK_SLIDES:
+        template += SECTION_PLAN_PROMPT + SECTION_PROMPT + str(OUTLINE_SECTION_SIZE)
+    return outline_cache_key(topic, num_slides, route(num_slides, draft).model, TEMPERATURE, template)
 
-    raw_response = chat_completion.choices[0].message.content.strip()
 
-    # Clean response
-    if raw_response.startswith("```json"):
-        raw_response = raw_response[7:]
-    if raw_response.startswith("```"):
-        raw_response = raw_response[3:]
-    if raw_response.endswith("```"):
-        raw_response = raw_response[:-3]
-    raw_response = raw_response.strip()
+def is_outline_cached(topic: str, num_slides: int = 8, draft: bool = False) -> bool:
+    return outline_cache.contains(_cache_key(topic, num_slides, draft))
 
+
+def _messages(topic: str, num_slides: int) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": OUTLINE_PROMPT.format(topic=topic, num_slides=num_slides)},
+    ]
+
+
+def _valid_slides(items: list[dict]) -> list[SlideContent]:
+    slides = []
+    for item in items:
+        try:
+            slides.append(SlideContent(**item))
+        except ValidationError as e:
+            print(f"⚠️  Dropping invalid slide '{item.get('title', '?')}': {e.error_count()} error(s)")
+    return slides
+
+
+def _parse_outline(raw_response: str, topic: str) -> PresentationOutline:
+    """Validate the model's outline, salvaging every complete, valid slide
+    when the JSON is truncated, wrapped in prose or partly invalid."""
+    raw_response = strip_code_fences(raw_response)
     try:
         data = json.loads(raw_response)
         outline = PresentationOutline(**data)
         print(f"✅ Generated {len(outline.slides)} slides for '{outline.topic}'")
         return outline
     except Exception as e:
-        print(f"❌ Parse error: {e}")
+        print(f"⚠️  Outline is not valid JSON ({type(e).__name__}), recovering complete slides")
+
+    data   = recover_outline(raw_response)
+    slides = _valid_slides(data["slides"])
+    if not slides:
+        print("❌ Parse error: no complete slides in the response")
         print(f"Raw response: {raw_response[:500]}")
-        raise
+        raise ValueError("The model response contained no complete, valid slides")
+    outline = PresentationOutline(topic=data["topic"] or topic, slides=slides)
+    print(f"🩹 Recovered {len(slides)} slides for '{outline.topic}'")
+    return outline
+
+
+# ── Groq concurrency ──────────────────────────────────────────────────────────
+_groq_slots = contextvars.ContextVar("groq_slots", default=None)
+
+
+@contextmanager
+def limit_groq(semaphore):
+    """Gate every Groq completion started in this context by `semaphore`,
+    including section, follow-up and hedge requests on worker threads
+    (they inherit the context through tracing.submit / _Attempt)."""
+    token = _groq_slots.set(semaphore)
+    try:
+        yield
+    finally:
+        _groq_slots.reset(token)
+
+
+@contextmanager
+def _groq_slot():
+    """Held for the duration of one Groq request when a limit is set."""
+    semaphore = _groq_slots.get()
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def _complete(messages: list[dict], model: str, max_tokens: int, num_slides=None, **attributes) -> str:
+    """One blocking Groq completion, recorded as a groq.completion span.
+    Pass the number of slides asked for as `num_slides` to feed model_stats,
+    and `purpose` for anything other than a full outline."""
+    with _groq_slot(), span("groq.completion", model=model, max_tokens=max_tokens, stream=False, **attributes) as completion:
+        chat_completion = providers.get("groq").chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+        )
+        raw_response = chat_completion.choices[0].message.content or ""
+        _record_usage(completion, getattr(chat_completion, "usage", None))
+        completion.set(response_chars=len(raw_response))
+    _record_stats(completion, model, num_slides)
+    return raw_response
+
+
+def _missing_slides(messages: list[dict], num_slides: int, outline: PresentationOutline,
+                    model: str) -> list[SlideContent]:
+    """Ask for just the slides a short or truncated outline is missing.
+    `messages` is the conversation that produced the outline."""
+    count = num_slides - len(outline.slides)
+    if count <= 0:
+        return []
+    titles = "\n".join(f"- {slide.title}" for slide in outline.slides)
+    try:
+        raw_response = _complete(
+            messages + [{"role": "user", "content": MISSING_SLIDES_PROMPT.format(titles=titles, count=count)}],
+            model, budget_tokens(model, count), num_slides=count, purpose="missing_slides", missing_slides=count,
+        )
+    except Exception as e:
+        print(f"⚠️  Follow-up for {count} missing slides failed: {e}")
+        return []
+
+    seen  = {slide.title.strip().lower() for slide in outline.slides}
+    added = []
+    for slide in _valid_slides(recover_outline(raw_response)["slides"]):
+        if slide.title.strip().lower() not in seen and len(added) < count:
+            seen.add(slide.title.strip().lower())
+            added.append(slide)
+    print(f"🧩 Follow-up added {len(added)} of {count} missing slides")
+    return added
+
+
+def _record_usage(completion_span, usage):
+    if usage is not None:
+        completion_span.set(
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+        )
+
+
+def _record_stats(completion_span, model: str, num_slides):
+    """Feed a finished completion span's token counts into model_stats,
+    tagged with the span's `purpose` (full outline unless set)."""
+    attributes = completion_span.attributes
+    # Time spent generating, excluding the wait for the first token when streamed
+    seconds = completion_span.duration - (attributes.get("time_to_first_token_s") or 0)
+    model_stats.record(
+        model, num_slides, attributes.get("prompt_tokens"), attributes.get("completion_tokens"), seconds,
+        first_token_s=attributes.get("time_to_first_token_s"), total_s=completion_span.duration,
+        purpose=attributes.get("purpose", "outline"),
+    )
+
+
+def _cached_outline(cache_key: str, topic: str):
+    with span("outline.cache_lookup") as lookup:
+        cached = outline_cache.get(cache_key)
+        lookup.set(hit=cached is not None)
+    if cached:
+        print(f"♻️  Reusing cached outline for '{topic}' ({len(cached.slides)} slides)")
+    return cached
+
+
+def _store(cache_key: str, outline: PresentationOutline):
+    try:
+        outline_cache.set(cache_key, outline)
+    except OSError as e:
+        print(f"⚠️  Could not cache outline: {e}")
+
+
+# ── Hedged requests ───────────────────────────────────────────────────────────
+class _Attempt:
+    """One streamed outline completion running on its own thread.
+
+    Text deltas are queued for the consumer as they arrive. `cancel()`
+    closes the HTTP stream so Groq stops generating (and billing) for it.
+    `signal` is shared by the attempts of one race and set whenever any of
+    them gets its first token or finishes.
+    """
+
+    def __init__(self, messages, model, max_tokens, num_slides, signal, **attributes):
+        self.model       = model
+        self.num_slides  = num_slides
+        self.signal      = signal
+        self.text        = ""
+        self.chars       = 0
+        self.error       = None
+        self.started     = time.monotonic()
+        self.first_token_at = None
+        self.finished_at    = None
+        self.first_token = threading.Event()
+        self.finished    = threading.Event()
+        self.cancelled   = threading.Event()
+        self._deltas     = queue.Queue()
+        self._stream     = None
+        self._args       = (messages, max_tokens, attributes)
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._run,), name="groq-attempt", daemon=True).start()
+
+    def _run(self):
+        messages, max_tokens, attributes = self._args
+        parts = []
+        try:
+            with _groq_slot():
+                if self.cancelled.is_set():
+                    return   # lost the race while waiting for a slot
+                with span("groq.completion", model=self.model, max_tokens=max_tokens, stream=True,
+                          **attributes) as completion:
+                    self._stream = providers.get("groq").chat.completions.create(
+                        messages=messages,
+                        model=self.model,
+                        temperature=TEMPERATURE,
+                        max_tokens=max_tokens,
+                        stream=True,
+                    )
+                    for chunk in self._stream:
+                        if self.cancelled.is_set():
+                            break
+                        x_groq = getattr(chunk, "x_groq", None)
+                        if x_groq is not None:
+                            _record_usage(completion, getattr(x_groq, "usage", None))
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if not delta:
+                            continue
+                        if self.first_token_at is None:
+                            self.first_token_at = time.monotonic()
+                            completion.set(time_to_first_token_s=round(completion.duration, 3))
+                            self.first_token.set()
+                            self.signal.set()
+                        parts.append(delta)
+                        self.chars += len(delta)
+                        self._deltas.put(delta)
+                    completion.set(response_chars=self.chars, cancelled=self.cancelled.is_set())
+            if not self.cancelled.is_set():
+                _record_stats(completion, self.model, self.num_slides)
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.error = e
+                print(f"⚠️  Outline request to {self.model} failed: {e}")
+        finally:
+            self._close()
+            self.text        = "".join(parts)
+            self.finished_at = time.monotonic()
+            self._deltas.put(None)
+            self.finished.set()
+            self.signal.set()
+
+    def _close(self):
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass   # e.g. a generator still running on the worker thread; it stops at the next chunk
+
+    def cancel(self):
+        self.cancelled.set()
+        self._close()
+
+    def deltas(self):
+        """Text deltas as they arrive; re-raises the request's error."""
+        while True:
+            delta = self._deltas.get()
+            if delta is None:
+                break
+            yield delta
+        if self.error is not None:
+            raise self.error
+
+    def outline(self):
+        """The finished response as a strictly valid outline, or None."""
+        if self.error is not None or not self.text:
+            return None
+        try:
+            return PresentationOutline(**json.loads(strip_code_fences(self.text)))
+        except Exception:
+            return None
+
+
+def _hedge_deadlines(model: str, num_slides: int):
+    """(first-token deadline, total deadline or None) in seconds."""
+    latency = model_stats.latency(model, num_slides, HEDGE_QUANTILE)
+    if latency is None:
+        return HEDGE_FIRST_TOKEN_S, None
+    return latency["first_token_s"] or HEDGE_FIRST_TOKEN_S, latency["total_s"]
+
+
+def _saved_seconds(primary: _Attempt, winner: _Attempt) -> float:
+    """Rough time the hedge saved over waiting for `primary`.
+
+    If the primary had produced text, its remaining time is projected at
+    its own pace to the winner's length. Otherwise it could at best have
+    matched the hedge from its head start, so the gap between the two
+    start times is counted: a lower bound.
+    """
+    if winner is primary or primary.error is not None:
+        return 0.0
+    now = time.monotonic()
+    if primary.first_token_at is None or not primary.chars or now <= primary.first_token_at:
+        return winner.started - primary.started
+    rate      = primary.chars / (now - primary.first_token_at)
+    remaining = max(0, max(winner.chars, primary.chars) - primary.chars) / rate
+    return (now + remaining) - (winner.finished_at or now)
+
+
+def _hedged_request(messages: list[dict], model: str, max_tokens: int, num_slides: int, until: str,
+                    **attributes) -> _Attempt:
+    """Race a second request against the first if it misses its deadline.
+
+    until="first_token" (streaming): the first attempt to produce text wins
+    and the caller reads its deltas. until="outline": the first attempt to
+    finish with a valid PresentationOutline wins; if none does, the longest
+    response is returned for recovery. Losers are cancelled.
+    """
+    signal = threading.Event()
+    first_deadline, total_deadline = _hedge_deadlines(model, num_slides)
+    primary  = _Attempt(messages, model, max_tokens, num_slides, signal, hedge="primary", **attributes)
+    attempts = [primary]
+    rejected = set()
+    winner   = None
+
+    with span("outline.hedge", until=until, first_token_deadline_s=round(first_deadline, 2),
+              total_deadline_s=round(total_deadline, 2) if total_deadline else None) as hedge:
+        while winner is None:
+            for attempt in attempts:
+                if until == "first_token" and attempt.first_token.is_set():
+                    winner = attempt
+                    break
+                if until == "outline" and attempt.finished.is_set() and attempt not in rejected:
+                    if attempt.outline() is not None:
+                        winner = attempt
+                        break
+                    rejected.add(attempt)
+            if winner is not None:
+                break
+            # Nothing usable and nothing left running (a primary that failed
+            # outright is hedged below instead)
+            if all(a.finished.is_set() for a in attempts) and (len(attempts) == 2 or primary.error is None):
+                winner = max(attempts, key=lambda a: (a.error is None, len(a.text)))
+                break
+
+            timeout = None
+            if len(attempts) == 1:
+                due = []
+                if not primary.first_token.is_set():
+                    due.append(primary.started + first_deadline)
+                if until == "outline" and total_deadline:
+                    due.append(primary.started + total_deadline)
+                if primary.finished.is_set():
+                    due = [0]   # failed outright: retry as the hedge right away
+                if due and time.monotonic() >= min(due):
+                    hedge_model = HEDGE_MODEL or model
+                    reason = "failed" if primary.finished.is_set() else \
+                        f"slow after {time.monotonic() - primary.started:.1f}s"
+                    print(f"🏇 Outline request {reason}, hedging with {hedge_model}")
+                    attempts.append(_Attempt(
+                        messages, hedge_model, budget_tokens(hedge_model, num_slides), num_slides, signal,
+                        hedge="secondary", **attributes,
+                    ))
+                    continue
+                timeout = min(due) - time.monotonic() if due else None
+            signal.wait(timeout)
+            signal.clear()
+
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+        fired     = len(attempts) > 1
+        hedge_won = winner is not primary
+        saved     = _saved_seconds(primary, winner)
+        hedge_stats.record(fired, hedge_won, saved)
+        hedge.set(fired=fired, winner="secondary" if hedge_won else "primary", saved_s=round(saved, 2))
+    if hedge_won:
+        print(f"🏁 Hedge won, ~{saved:.1f}s saved")
+    return winner
+
+
+def _slides_from(parser: SlideStreamParser, delta: str):
+    for data in parser.feed(delta):
+        try:
+            yield SlideContent(**data)
+        except ValidationError as e:
+            print(f"⚠️  Skipping invalid streamed slide: {e}")
+
+
+def stream_outline(topic: str, num_slides: int = 8, use_cache: bool = True, draft: bool = False,
+                   hedge: bool = None):
+    """Generator form of build_outline.
+
+    Yields each SlideContent as soon as its JSON object has been streamed
+    in full, so callers can start on slide 1 while later slides are still
+    being generated. The validated PresentationOutline is the generator's
+    return value (`outline = yield from stream_outline(...)`).
+    """
+    cache_key = _cache_key(topic, num_slides, draft)
+    if use_cache:
+        cached = _cached_outline(cache_key, topic)
+        if cached:
+            yield from cached.slides
+            return cached
+
+    model, max_tokens, tier = route(num_slides, draft)
+    parser = SlideStreamParser()
+    if HEDGE_OUTLINES if hedge is None else hedge:
+        attempt = _hedged_request(_messages(topic, num_slides), model, max_tokens, num_slides,
+                                  until="first_token", tier=tier)
+        model = attempt.model
+        for delta in attempt.deltas():
+            yield from _slides_from(parser, delta)
+    else:
+        with _groq_slot(), \
+             span("groq.completion", model=model, max_tokens=max_tokens, tier=tier, stream=True) as completion:
+            stream = providers.get("groq").chat.completions.create(
+                messages=_messages(topic, num_slides),
+                model=model,
+                temperature=TEMPERATURE,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None:
+                    _record_usage(completion, getattr(x_groq, "usage", None))
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if "time_to_first_token_s" not in completion.attributes:
+                    completion.set(time_to_first_token_s=round(completion.duration, 3))
+                yield from _slides_from(parser, delta)
+            completion.set(response_chars=len(parser.buffer))
+        _record_stats(completion, model, num_slides)
+
+    with span("outline.parse"):
+        outline = _parse_outline(parser.buffer, topic)
+    extra = _missing_slides(_messages(topic, num_slides), num_slides, outline, model)
+    if extra:
+        yield from extra
+        outline = PresentationOutline(topic=outline.topic, slides=outline.slides + extra)
+    _store(cache_key, outline)
+    return outline
+
+
+def build_outline(topic: str, num_slides: int = 8, use_cache: bool = True, on_slide=None,
+                  draft: bool = False, hedge: bool = None) -> PresentationOutline:
+    """Research `topic` into a validated outline.
+
+    Results are cached on disk by (topic, num_slides, model, temperature,
+    prompt); pass use_cache=False to force a fresh generation. When
+    `on_slide(index, slide)` is given the completion is streamed and the
+    callback fires for each slide as soon as it is complete.
+
+    The model and max_tokens come from model_router.route: `draft=True`
+    (or a very small deck) uses the fast tier. Decks longer than
+    LARGE_DECK_SLIDES go through build_sectioned_outline.
+
+    With `hedge` (default: HEDGE_OUTLINES) a slow request is raced by a
+    second one once it passes the HEDGE_QUANTILE latency for its model:
+    when streaming, whichever produces text first is used; otherwise the
+    first valid outline wins. The other request is cancelled.
+    """
+    if num_slides > LARGE_DECK_SLIDES:
+        return build_sectioned_outline(topic, num_slides, use_cache=use_cache, on_slide=on_slide, draft=draft)
+
+    if on_slide is not None:
+        stream = stream_outline(topic, num_slides, use_cache=use_cache, draft=draft, hedge=hedge)
+        index = 0
+        while True:
+            try:
+                slide = next(stream)
+            except StopIteration as done:
+                return done.value
+            index += 1
+            on_slide(index, slide)
+
+    cache_key = _cache_key(topic, num_slides, draft)
+    if use_cache:
+        cached = _cached_outline(cache_key, topic)
+        if cached:
+            return cached
+
+    model, max_tokens, tier = route(num_slides, draft)
+    if HEDGE_OUTLINES if hedge is None else hedge:
+        attempt = _hedged_request(_messages(topic, num_slides), model, max_tokens, num_slides,
+                                  until="outline", tier=tier)
+        if attempt.error is not None:
+            raise attempt.error
+        model, raw_response = attempt.model, attempt.text
+    else:
+        raw_response = _complete(_messages(topic, num_slides), model, max_tokens, num_slides=num_slides, tier=tier)
+    with span("outline.parse"):
+        outline = _parse_outline(raw_response, topic)
+    extra = _missing_slides(_messages(topic, num_slides), num_slides, outline, model)
+    if extra:
+        outline = PresentationOutline(topic=outline.topic, slides=outline.slides + extra)
+    _store(cache_key, outline)
+    return outline
+
+
+def generate_slide(outline: PresentationOutline, index: int, instructions: str = "",
+                   draft: bool = False) -> SlideContent:
+    """A replacement for slide `index` (1-based) of `outline`, written with
+    the rest of the deck as context. Only one slide's tokens are generated."""
+    model  = route(len(outline.slides), draft).model
+    titles = "\n".join(f"{i}. {slide.title}" for i, slide in enumerate(outline.slides, start=1))
+    prompt = SLIDE_PROMPT.format(
+        index=index, total=len(outline.slides), topic=outline.topic, titles=titles,
+        current=outline.slides[index - 1].model_dump_json(),
+        instructions=instructions.strip() or DEFAULT_SLIDE_INSTRUCTIONS,
+    )
+    with span("slide.generate", index=index):
+        raw_response = _complete(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            model, budget_tokens(model, 1), num_slides=1, purpose="slide",
+        )
+        raw_response = strip_code_fences(raw_response)
+        try:
+            data = json.loads(raw_response[raw_response.find("{"):raw_response.rfind("}") + 1])
+            if isinstance(data.get("slides"), list) and data["slides"]:
+                data = data["slides"][0]
+            slide = SlideContent(**data)
+        except Exception as e:
+            print(f"❌ Parse error: {e}")
+            print(f"Raw response: {raw_response[:500]}")
+            raise ValueError(f"The model returned no valid slide for slide {index}") from e
+    print(f"✅ Regenerated slide {index}: '{slide.title}'")
+    return slide
+
+
+# ── Large decks ───────────────────────────────────────────────────────────────
+def _split_evenly(total: int, parts: int) -> list[int]:
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _plan_sections(topic: str, num_slides: int, model: str) -> tuple[str, list[dict]]:
+    """(deck title, [{"title", "focus", "num_slides"}]) for a large deck.
+    Falls back to numbered parts if the plan can't be parsed."""
+    num_sections = math.ceil(num_slides / OUTLINE_SECTION_SIZE)
+    deck_title, sections = topic, []
+    try:
+        raw_response = _complete(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": SECTION_PLAN_PROMPT.format(
+                    topic=topic, num_slides=num_slides, num_sections=num_sections)},
+            ],
+            model, PLAN_MAX_TOKENS, purpose="section_plan",
+        )
+        raw_response = strip_code_fences(raw_response)
+        data = json.loads(raw_response[raw_response.find("{"):raw_response.rfind("}") + 1])
+        deck_title = data.get("topic") or topic
+        sections = [
+            {"title": str(s["title"]), "focus": str(s.get("focus", ""))}
+            for s in data.get("sections", []) if isinstance(s, dict) and s.get("title")
+        ][:num_sections]
+    except Exception as e:
+        print(f"⚠️  Section plan failed ({e}), using numbered parts")
+    while len(sections) < num_sections:
+        sections.append({"title": f"Part {len(sections) + 1}", "focus": f"{topic}, continued"})
+
+    for section, size in zip(sections, _split_evenly(num_slides, num_sections)):
+        section["num_slides"] = size
+    print(f"🗂️  Planned {num_sections} sections for '{deck_title}': " + ", ".join(s["title"] for s in sections))
+    return deck_title, sections
+
+
+def _generate_section(topic: str, sections: list[dict], index: int, model: str, tier: str) -> list[SlideContent]:
+    """Slides of one section on the deck's `model`; only max_tokens is
+    budgeted from the section's size."""
+    section    = sections[index]
+    max_tokens = budget_tokens(model, section["num_slides"])
+    others  = "\n".join(f"- {s['title']}" for i, s in enumerate(sections) if i != index)
+    prompt  = SECTION_PROMPT.format(
+        index=index + 1, total=len(sections), topic=topic,
+        title=section["title"], focus=section["focus"], others=others,
+    ) + OUTLINE_PROMPT.format(topic=f"{topic}: {section['title']}", num_slides=section["num_slides"])
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    with span("outline.section", section=index + 1, slides=section["num_slides"]):
+        raw_response = _complete(messages, model, max_tokens, num_slides=section["num_slides"],
+                                 tier=tier, purpose="section", section=index + 1)
+        with span("outline.parse"):
+            outline = _parse_outline(raw_response, topic)
+        slides = outline.slides + _missing_slides(messages, section["num_slides"], outline, model)
+    return slides[:section["num_slides"]]
+
+
+def _dedupe_titles(sections: list[dict], section_slides: list[list[SlideContent]]) -> list[SlideContent]:
+    """Concatenate sections in order, renaming slides whose title repeats
+    an earlier one (sections are generated independently)."""
+    seen, merged = set(), []
+    for section, slides in zip(sections, section_slides):
+        for slide in slides:
+            title = slide.title.strip()
+            if title.lower() in seen:
+                title = f"{slide.title.strip()} — {section['title']}"
+                n = 2
+                while title.lower() in seen:
+                    title = f"{slide.title.strip()} ({n})"
+                    n += 1
+                slide = slide.model_copy(update={"title": title})
+            seen.add(title.lower())
+            merged.append(slide)
+    return merged
+
+
+def build_sectioned_outline(topic: str, num_slides: int, use_cache: bool = True,
+                            on_slide=None, draft: bool = False) -> PresentationOutline:
+    """Outline for a large deck: one short call plans the sections, then
+    every section's slides are generated concurrently and merged in order.
+
+    Latency is roughly plan + the slowest section instead of growing with
+    the slide count, and no single completion approaches the token ceiling.
+    `on_slide` fires in slide order as each leading section completes.
+    """
+    cache_key = _cache_key(topic, num_slides, draft)
+    if use_cache:
+        cached = _cached_outline(cache_key, topic)
+        if cached:
+            if on_slide is not None:
+                for index, slide in enumerate(cached.slides, start=1):
+                    on_slide(index, slide)
+            return cached
+
+    # Route by deck size once, so every section is written by the model the cache key records
+    model, _, tier = route(num_slides, draft)
+    with span("outline.sectioned", num_slides=num_slides, model=model):
+        deck_title, sections = _plan_sections(topic, num_slides, model)
+        workers = max(1, min(OUTLINE_SECTION_WORKERS, len(sections)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [submit(pool, _generate_section, topic, sections, i, model, tier)
+                       for i in range(len(sections))]
+            section_slides, index = [], 0
+            for i, future in enumerate(futures):
+                section_slides.append(future.result())
+                if on_slide is not None:
+                    done = _dedupe_titles(sections[:i + 1], section_slides)
+                    for slide in done[index:]:
+                        index += 1
+                        on_slide(index, slide)
+
+    outline = PresentationOutline(topic=deck_title, slides=_dedupe_titles(sections, section_slides))
+    print(f"✅ Generated {len(outline.slides)} slides in {len(sections)} sections for '{outline.topic}'")
+    _store(cache_key, outline)
+    return outline
 
 
 if __name__ == "__main__":
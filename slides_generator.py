@@ -1,14 +1,34 @@
+import json
+import os
+import secrets
 import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from google_auth import get_services
-from models import PresentationOutline
-from image_search import find_image_url
-from dotenv import load_dotenv
+from google_scheduler import scheduler, http_status
+from theme_templates import template_store, template_requests, template_key, USE_THEME_TEMPLATES
+from models import PresentationOutline, SlideContent
+from image_search import find_image_url, find_image_urls, check_image_url, forget_image_url, IMAGE_WORKERS
+from tracing import span, submit
+import providers
 
-load_dotenv()
+providers.load_env()
 
 SLIDE_WIDTH_EMU  = 9144000
 SLIDE_HEIGHT_EMU = 6858000
 
+# A batchUpdate is atomic and its latency grows with its size, so content
+# that exceeds either limit goes out as consecutive, order-preserving chunks
+BATCH_MAX_REQUESTS = int(os.getenv("SLIDES_BATCH_MAX_REQUESTS", "250"))
+BATCH_MAX_BYTES    = int(os.getenv("SLIDES_BATCH_MAX_BYTES", str(512 * 1024)))
+
+# presentations().create returns every master and layout in full; we only
+# read object IDs, layout names and placeholder types/geometry
+CREATE_FIELDS = (
+    "presentationId,slides.objectId,masters.objectId,"
+    "layouts(objectId,layoutProperties.name,pageElements(objectId,size,transform,shape.placeholder.type))"
+)
+
 THEME_STYLES = {
     "Default (No Theme)": {
         "title_color":           {"red": 0.13, "green": 0.13, "blue": 0.53},
@@ -66,9 +86,9 @@ def safe_get(obj, *keys, default=None):
 
 
 # ── Table Builder ─────────────────────────────────────────────────────────────
-def build_table_requests(page_object_id, table_data, slide_index, header_color, body_text_color):
+def build_table_requests(page_object_id, table_data, slide_index, header_color, body_text_color, table_id=None):
     requests = []
-    table_id = f"table_{slide_index}"
+    table_id = table_id or f"table_{slide_index}"
 
     headers = [str(h) for h in table_data.headers]
     rows    = []
@@ -105,144 +125,476 @@ def build_table_requests(page_object_id, table_data, slide_index, header_color,
         }
     })
 
-    # 2. Header row — always white text on colored background
-    for col_idx, header in enumerate(headers):
-        requests.append({
-            "insertText": {
-                "objectId": table_id,
-                "cellLocation": {"rowIndex": 0, "columnIndex": col_idx},
-                "text": header,
-            }
-        })
-        requests.append({
-            "updateTextStyle": {
-                "objectId": table_id,
-                "cellLocation": {"rowIndex": 0, "columnIndex": col_idx},
-                "style": {
-                    "bold": True,
-                    "fontSize": {"magnitude": 14, "unit": "PT"},
-                    "foregroundColor": {
-                        "opaqueColor": {
-                            "rgbColor": {"red": 1.0, "green": 1.0, "blue": 1.0}
-                        }
-                    },
-                },
-                "fields": "bold,fontSize,foregroundColor",
-            }
-        })
-        requests.append({
-            "updateTableCellProperties": {
-                "objectId": table_id,
-                "tableRange": {
-                    "location": {"rowIndex": 0, "columnIndex": col_idx},
-                    "rowSpan": 1, "columnSpan": 1,
-                },
-                "tableCellProperties": {
-                    "tableCellBackgroundFill": {
-                        "solidFill": {"color": {"rgbColor": header_color}}
-                    }
-                },
-                "fields": "tableCellBackgroundFill.solidFill.color",
-            }
-        })
+    # 2. Header row — one background fill over the whole row
+    requests.append({
+        "updateTableCellProperties": {
+            "objectId": table_id,
+            "tableRange": {
+                "location": {"rowIndex": 0, "columnIndex": 0},
+                "rowSpan": 1, "columnSpan": num_cols,
+            },
+            "tableCellProperties": {
+                "tableCellBackgroundFill": {
+                    "solidFill": {"color": {"rgbColor": header_color}}
+                }
+            },
+            "fields": "tableCellBackgroundFill.solidFill.color",
+        }
+    })
 
-    # 3. Data rows — theme-aware text color
-    for row_idx, row in enumerate(rows, start=1):
-        for col_idx, cell in enumerate(row):
+    # 3. Cell text — the API only styles text one cell at a time, so empty
+    #    cells get neither an insert nor a style request
+    header_style = {
+        "bold": True,
+        "fontSize": {"magnitude": 14, "unit": "PT"},
+        "foregroundColor": {
+            "opaqueColor": {"rgbColor": {"red": 1.0, "green": 1.0, "blue": 1.0}}  # always white
+        },
+    }
+    body_style = {
+        "fontSize": {"magnitude": 11, "unit": "PT"},
+        "foregroundColor": {
+            "opaqueColor": {"rgbColor": body_text_color}  # ← theme-aware
+        },
+    }
+    for row_idx, row in enumerate([headers] + rows):
+        style  = header_style if row_idx == 0 else body_style
+        fields = "bold,fontSize,foregroundColor" if row_idx == 0 else "fontSize,foregroundColor"
+        for col_idx, cell in enumerate(row[:num_cols]):
+            if not cell.strip():
+                continue
+            location = {"rowIndex": row_idx, "columnIndex": col_idx}
             requests.append({
                 "insertText": {
                     "objectId": table_id,
-                    "cellLocation": {
-                        "rowIndex":    row_idx,
-                        "columnIndex": col_idx,
-                    },
+                    "cellLocation": location,
                     "text": cell,
                 }
             })
             requests.append({
                 "updateTextStyle": {
                     "objectId": table_id,
-                    "cellLocation": {
-                        "rowIndex":    row_idx,
-                        "columnIndex": col_idx,
-                    },
-                    "style": {
-                        "fontSize": {"magnitude": 11, "unit": "PT"},
-                        "foregroundColor": {
-                            "opaqueColor": {"rgbColor": body_text_color}  # ← theme-aware
-                        },
-                    },
-                    "fields": "fontSize,foregroundColor",
+                    "cellLocation": location,
+                    "style": style,
+                    "fields": fields,
                 }
             })
 
     return requests
 
 
+def request_stats(requests) -> dict:
+    """Request count and serialized JSON size of a list of Slides requests."""
+    return {
+        "requests": len(requests),
+        "bytes":    len(json.dumps(requests, separators=(",", ":")).encode("utf-8")),
+    }
+
+
+def chunk_requests(requests, max_requests: int = BATCH_MAX_REQUESTS, max_bytes: int = BATCH_MAX_BYTES) -> list:
+    """Split `requests` into consecutive batches of at most `max_requests`
+    requests and `max_bytes` of JSON each (a single larger request gets a
+    batch of its own). Order is kept, so later requests still see the
+    objects earlier ones created."""
+    chunks, chunk, size = [], [], 0
+    for request in requests:
+        request_bytes = len(json.dumps(request, separators=(",", ":")).encode("utf-8")) + 1
+        if chunk and (len(chunk) >= max_requests or size + request_bytes > max_bytes):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(request)
+        size += request_bytes
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+# ── API call accounting ───────────────────────────────────────────────────────
+def _execute(request, stats, name: str, **attributes):
+    """Run a Google API request through the quota scheduler, counting it
+    under `name` in `stats` and recording it as a `google.<name>` span."""
+    if stats is not None:
+        stats[name] += 1
+    body = getattr(request, "body", None)
+    with span(f"google.{name}", **attributes) as call:
+        if isinstance(body, (str, bytes)):
+            call.set(payload_bytes=len(body))
+        return scheduler.execute(request, name, call)
+
+
+def _format_stats(stats) -> str:
+    calls = ", ".join(f"{name}={count}" for name, count in sorted(stats.items()))
+    return f"{sum(stats.values())} ({calls})"
+
+
+# ── Provisioning ──────────────────────────────────────────────────────────────
+# Placeholder object IDs are assigned by us at creation time through
+# placeholderIdMappings, so no presentations().get is needed to find them.
+def title_placeholder_id(slide_index: int) -> str:
+    return f"slide_{slide_index}_title"
+
+
+def body_placeholder_id(slide_index: int) -> str:
+    return f"slide_{slide_index}_body"
+
+
+def subtitle_placeholder_id() -> str:
+    return "slide_0_subtitle"
+
+
+def _create_slide_requests(start: int, count: int) -> list:
+    requests = []
+    for i in range(start, start + count):
+        if i == 0:
+            layout   = "TITLE"
+            mappings = [
+                ("CENTERED_TITLE", title_placeholder_id(0)),
+                ("SUBTITLE",       subtitle_placeholder_id()),
+            ]
+        else:
+            layout   = "TITLE_AND_BODY"
+            mappings = [
+                ("TITLE", title_placeholder_id(i)),
+                ("BODY",  body_placeholder_id(i)),
+            ]
+        requests.append({
+            "createSlide": {
+                "objectId": f"slide_{i}",
+                "slideLayoutReference": {"predefinedLayout": layout},
+                "placeholderIdMappings": [
+                    {"layoutPlaceholder": {"type": ph_type, "index": 0}, "objectId": object_id}
+                    for ph_type, object_id in mappings
+                ],
+            }
+        })
+    return requests
+
+
+def _body_geometry(presentation) -> dict:
+    """Size/transform of the TITLE_AND_BODY body placeholder, read from the
+    layouts that presentations().create already returns."""
+    geometry = {"width": 8229600, "transform": {}}
+    for layout in presentation.get("layouts", []):
+        if safe_get(layout, "layoutProperties", "name") != "TITLE_AND_BODY":
+            continue
+        for element in layout.get("pageElements", []):
+            if safe_get(element, "shape", "placeholder", "type") in ("BODY", "OBJECT"):
+                width = safe_get(element, "size", "width", "magnitude")
+                if isinstance(width, (int, float)) and width:
+                    geometry["width"] = width
+                geometry["transform"] = element.get("transform", {})
+                return geometry
+    return geometry
+
+
+def ensure_theme_template(slides_service, styles: dict, name: str = "", stats=None,
+                          drive_service=None) -> dict:
+    """Template record for `styles` owned by the current Google account,
+    creating the template deck on first use.
+
+    Creation is one presentations().create plus one batchUpdate that styles
+    the master and layouts; concurrent callers for the same theme and
+    account wait for a single creation. If styling fails the half-built
+    deck is deleted (given `drive_service`) and the key is marked failed,
+    so provision_presentation stops trying it for this process.
+    """
+    key  = template_key(styles)
+    name = name or next((theme for theme, entry in THEME_STYLES.items() if entry == styles), key)
+    template = template_store.get(key)
+    if template:
+        return template
+    with template_store.creation_lock(key):
+        template = template_store.get(key)
+        if template:
+            return template
+        presentation = _execute(
+            slides_service.presentations().create(
+                body={"title": f"AI PPT Maker template — {name}"},
+                fields=CREATE_FIELDS,
+            ),
+            stats, "slides.create",
+        )
+        requests, baked = template_requests(presentation, styles)
+        if requests:
+            try:
+                _execute(
+                    slides_service.presentations().batchUpdate(
+                        presentationId=presentation["presentationId"],
+                        body={"requests": requests},
+                    ),
+                    stats, "slides.batchUpdate", requests=len(requests),
+                )
+            except Exception:
+                template_store.mark_failed(key)
+                if drive_service is not None:
+                    discard_presentation(drive_service, presentation["presentationId"], stats=stats)
+                raise
+        template = {
+            "name":             name,
+            "presentation_id":  presentation["presentationId"],
+            "default_slide_id": presentation["slides"][0]["objectId"],
+            "body_geometry":    _body_geometry(presentation),
+            "baked_styles":     baked,
+        }
+        template_store.set(key, template)
+        print(f"🎨 Created theme template {name}: {template['presentation_id']}")
+        return template
+
+
+def _copy_template(drive_service, styles: dict, template: dict, title: str, stats=None):
+    """Drive copy of a template deck, or None if the copy failed."""
+    try:
+        copy = _execute(
+            drive_service.files().copy(
+                fileId=template["presentation_id"],
+                body={"name": title},
+                fields="id",
+            ),
+            stats, "drive.files.copy",
+        )
+        return copy["id"]
+    except Exception as e:
+        print(f"⚠️  Could not copy theme template {template['presentation_id']}: {e}")
+        if http_status(e) == 404:
+            template_store.drop(template_key(styles))  # deleted in Drive; recreated on next use
+        return None
+
+
+def provision_presentation(slides_service, title: str, num_slides: int = None, stats=None,
+                           drive_service=None, styles: dict = None) -> dict:
+    """Create a deck and, if `num_slides` is given, its empty slides.
+
+    Only the slide count is needed, so this can run while the outline is
+    still being researched. When `num_slides` is None the default slide is
+    left in place and populate_presentation folds its deletion and the
+    slide creation into the content batchUpdate instead.
+
+    With `drive_service` and `styles` the deck is copied from that theme's
+    template (see theme_templates.py) so its background and text styles
+    are already in place; if the copy fails a blank deck is created.
+
+    Returns a deck dict that populate_presentation consumes.
+    """
+    # 1. Copy the theme template, or create a blank presentation
+    deck = None
+    if USE_THEME_TEMPLATES and drive_service is not None and styles is not None \
+            and not template_store.failed(template_key(styles)):
+        try:
+            template = ensure_theme_template(slides_service, styles, stats=stats, drive_service=drive_service)
+        except Exception as e:
+            print(f"⚠️  Could not create theme template: {e}")
+            template = None
+        presentation_id = template and _copy_template(drive_service, styles, template, title, stats=stats)
+        if presentation_id:
+            print(f"Created presentation ID: {presentation_id} (from theme template)")
+            deck = {
+                "presentation_id":  presentation_id,
+                "default_slide_id": template["default_slide_id"],
+                "slide_count":      None,
+                "body_geometry":    template["body_geometry"],
+                "notes_ids":        {},
+                "baked_styles":     template["baked_styles"],
+            }
+
+    if deck is None:
+        presentation = _execute(
+            slides_service.presentations().create(body={"title": title}, fields=CREATE_FIELDS),
+            stats, "slides.create",
+        )
+        presentation_id = presentation["presentationId"]
+        print(f"Created presentation ID: {presentation_id}")
+
+        deck = {
+            "presentation_id":  presentation_id,
+            "default_slide_id": presentation["slides"][0]["objectId"],
+            "slide_count":      None,
+            "body_geometry":    _body_geometry(presentation),
+            "notes_ids":        {},
+            "baked_styles":     [],
+        }
+
+    # 2. Delete default blank slide and create all slides in one call
+    if num_slides is not None:
+        _execute(
+            slides_service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={"requests": [
+                    {"deleteObject": {"objectId": deck["default_slide_id"]}},
+                    *_create_slide_requests(0, num_slides + 1),
+                ]},
+            ),
+            stats, "slides.batchUpdate",
+        )
+        deck["default_slide_id"] = None
+        deck["slide_count"]      = num_slides
+    return deck
+
+
+def load_speaker_notes_ids(slides_service, deck: dict, stats=None):
+    """Fetch only the speaker-notes shape IDs, which the API cannot let us
+    assign ourselves, via a field-masked presentations().get."""
+    presentation = _execute(
+        slides_service.presentations().get(
+            presentationId=deck["presentation_id"],
+            fields="slides(objectId,slideProperties.notesPage.notesProperties.speakerNotesObjectId)",
+        ),
+        stats, "slides.get",
+    )
+    for page in presentation.get("slides", []):
+        notes_id = safe_get(page, "slideProperties", "notesPage", "notesProperties", "speakerNotesObjectId")
+        if notes_id:
+            deck["notes_ids"][page["objectId"]] = notes_id
+
+
+def share_presentation(drive_service, presentation_id: str, stats=None) -> str:
+    _execute(
+        drive_service.permissions().create(
+            fileId=presentation_id,
+            body={"role": "reader", "type": "anyone"}
+        ),
+        stats, "drive.permissions.create",
+    )
+
+    link = f"https://docs.google.com/presentation/d/{presentation_id}/edit"
+    print(f"\n✅ Presentation link: {link}")
+    return link
+
+
+def discard_presentation(drive_service, presentation_id: str, stats=None):
+    """Delete a deck that will never be filled (e.g. research failed after
+    it was provisioned). Best effort: a failure is reported, not raised."""
+    try:
+        _execute(drive_service.files().delete(fileId=presentation_id), stats, "drive.files.delete")
+        print(f"🗑️  Deleted unused presentation {presentation_id}")
+    except Exception as e:
+        print(f"⚠️  Could not delete unused presentation {presentation_id}: {e}")
+
+
+# ── Shared request builders ───────────────────────────────────────────────────
+# Image geometry in EMU, shared with the .pptx backend in renderers.py
+IMAGE_W, IMAGE_H = 3800000, 3200000                                 # right half of a content slide
+IMAGE_X, IMAGE_Y = SLIDE_WIDTH_EMU - IMAGE_W - 150000, 1300000
+HERO_W,  HERO_H  = 4000000, 2250000                                 # centred on the title slide
+HERO_X,  HERO_Y  = (SLIDE_WIDTH_EMU - HERO_W) // 2, int(SLIDE_HEIGHT_EMU * 0.42)
+
+
+def _title_style_request(object_id: str, color: dict, size_pt: int) -> dict:
+    return {
+        "updateTextStyle": {
+            "objectId": object_id,
+            "style": {
+                "bold": True,
+                "fontSize": {"magnitude": size_pt, "unit": "PT"},
+                "foregroundColor": {
+                    "opaqueColor": {"rgbColor": color}
+                },
+            },
+            "fields": "bold,fontSize,foregroundColor",
+        }
+    }
+
+
+def _body_style_request(object_id: str, color: dict) -> dict:
+    return {
+        "updateTextStyle": {
+            "objectId": object_id,
+            "style": {
+                "fontSize": {"magnitude": 14, "unit": "PT"},
+                "foregroundColor": {
+                    "opaqueColor": {"rgbColor": color}
+                },
+            },
+            "fields": "fontSize,foregroundColor",
+        }
+    }
+
+
+def _slide_image_request(object_id: str, page_id: str, url: str) -> dict:
+    """Image on the right half of a content slide."""
+    return {
+        "createImage": {
+            "objectId": object_id,
+            "url": url,
+            "elementProperties": {
+                "pageObjectId": page_id,
+                "size": {
+                    "height": {"magnitude": IMAGE_H, "unit": "EMU"},
+                    "width":  {"magnitude": IMAGE_W, "unit": "EMU"},
+                },
+                "transform": {
+                    "scaleX": 1, "scaleY": 1,
+                    "translateX": IMAGE_X,
+                    "translateY": IMAGE_Y,
+                    "unit": "EMU",
+                },
+            },
+        }
+    }
+
+
+def _bullet_text(slide: SlideContent) -> str:
+    return "\n".join(f"• {b}" for b in slide.bullets)
+
+
 # ── Main Presentation Builder ─────────────────────────────────────────────────
 def create_presentation(
     outline: PresentationOutline,
     theme: str = "Default (No Theme)",
     image_url: str = "",
     use_images: bool = True,
+    image_workers: int = IMAGE_WORKERS,
+    stats: Counter = None,
+    image_urls: dict = None,
+    styles: dict = None,
 ) -> str:
+    """Build and share a deck. Pass a Counter as `stats` to collect the
+    number of Google API calls made, keyed by endpoint, and `image_urls`
+    to reuse {image_query: url} lookups done ahead of time. `styles`
+    overrides the THEME_STYLES entry picked by `theme`."""
+    stats  = Counter() if stats is None else stats
+    styles = styles or THEME_STYLES.get(theme, THEME_STYLES["Default (No Theme)"])
     slides_service, drive_service = get_services()
+    deck = provision_presentation(slides_service, outline.topic, stats=stats,
+                                  drive_service=drive_service, styles=styles)
+    populate_presentation(
+        slides_service,
+        deck,
+        outline,
+        theme=theme,
+        image_url=image_url,
+        use_images=use_images,
+        image_workers=image_workers,
+        image_urls=image_urls,
+        stats=stats,
+        styles=styles,
+    )
+    link = share_presentation(drive_service, deck["presentation_id"], stats=stats)
+    print(f"📡 Google API calls: {_format_stats(stats)}")
+    return link
 
-    # 1. Create blank presentation
-    presentation = slides_service.presentations().create(
-        body={"title": outline.topic}
-    ).execute()
-    presentation_id = presentation["presentationId"]
-    print(f"Created presentation ID: {presentation_id}")
-
-    # Delete default blank slide
-    default_slide_id = presentation["slides"][0]["objectId"]
-    slides_service.presentations().batchUpdate(
-        presentationId=presentation_id,
-        body={"requests": [{"deleteObject": {"objectId": default_slide_id}}]},
-    ).execute()
-
-    styles = THEME_STYLES.get(theme, THEME_STYLES["Default (No Theme)"])
-
-    # 2. Create all slides
-    create_requests = [{
-        "createSlide": {
-            "objectId": "slide_0",
-            "slideLayoutReference": {"predefinedLayout": "TITLE"},
-        }
-    }]
-    for i in range(len(outline.slides)):
-        create_requests.append({
-            "createSlide": {
-                "objectId": f"slide_{i+1}",
-                "slideLayoutReference": {"predefinedLayout": "TITLE_AND_BODY"},
-            }
-        })
-
-    slides_service.presentations().batchUpdate(
-        presentationId=presentation_id,
-        body={"requests": create_requests}
-    ).execute()
 
-    # 3. Fetch updated presentation
-    presentation = slides_service.presentations().get(
-        presentationId=presentation_id
-    ).execute()
+def _build_content_requests(deck, outline, styles, use_images) -> list:
+    """Compile every content request except images for a provisioned deck,
+    in the order the batchUpdate must apply them."""
+    num_slides = len(outline.slides)
 
     background_requests = []
     delete_requests     = []
     resize_requests     = []
     text_requests       = []
-    image_requests      = []
     table_requests      = []
 
-    # 4. Background color per theme
-    if styles.get("background_color"):
+    # Styles already carried by the theme template's master and layouts
+    baked_background = "background" in deck.get("baked_styles", ())
+    baked_text       = "text" in deck.get("baked_styles", ())
+
+    # Background color per theme
+    if styles.get("background_color") and not baked_background:
         bg = styles["background_color"]
-        for slide in presentation["slides"]:
+        for i in range(num_slides + 1):
             background_requests.append({
                 "updatePageProperties": {
-                    "objectId": slide["objectId"],
+                    "objectId": f"slide_{i}",
                     "pageProperties": {
                         "pageBackgroundFill": {
                             "solidFill": {"color": {"rgbColor": bg}}
@@ -252,96 +604,37 @@ def create_presentation(
                 }
             })
 
-    # 5. Title slide
-    title_slide    = presentation["slides"][0]
-    title_slide_id = title_slide["objectId"]
-
-    for element in title_slide.get("pageElements", []):
-        if "shape" in element:
-            ph_type = safe_get(element, "shape", "placeholder", "type", default="")
-            if ph_type == "CENTERED_TITLE":
-                text_requests += [
-                    {"insertText": {"objectId": element["objectId"], "text": outline.topic}},
-                    {
-                        "updateTextStyle": {
-                            "objectId": element["objectId"],
-                            "style": {
-                                "bold": True,
-                                "fontSize": {"magnitude": 38, "unit": "PT"},
-                                "foregroundColor": {
-                                    "opaqueColor": {"rgbColor": styles["title_color"]}
-                                },
-                            },
-                            "fields": "bold,fontSize,foregroundColor",
-                        }
-                    },
-                ]
-            elif ph_type == "SUBTITLE":
-                text_requests.append({
-                    "insertText": {
-                        "objectId": element["objectId"],
-                        "text": "AI-Generated Presentation",
-                    }
-                })
+    # Title slide
+    text_requests.append({"insertText": {"objectId": title_placeholder_id(0), "text": outline.topic}})
+    if not baked_text:
+        text_requests.append(_title_style_request(title_placeholder_id(0), styles["title_color"], 38))
+    text_requests.append({
+        "insertText": {
+            "objectId": subtitle_placeholder_id(),
+            "text": "AI-Generated Presentation",
+        }
+    })
 
-    # Hero image on title slide
-    if image_url.strip():
-        hero_w = 4000000
-        hero_h = 2250000
-        image_requests.append({
-            "createImage": {
-                "objectId": "hero_image_title",
-                "url": image_url.strip(),
-                "elementProperties": {
-                    "pageObjectId": title_slide_id,
-                    "size": {
-                        "height": {"magnitude": hero_h, "unit": "EMU"},
-                        "width":  {"magnitude": hero_w, "unit": "EMU"},
-                    },
-                    "transform": {
-                        "scaleX": 1, "scaleY": 1,
-                        "translateX": int((SLIDE_WIDTH_EMU - hero_w) / 2),
-                        "translateY": int(SLIDE_HEIGHT_EMU * 0.42),
-                        "unit": "EMU",
-                    },
-                },
-            }
-        })
 
-    # 6. Content slides
+    # Content slides
     for i, slide in enumerate(outline.slides, start=1):
         try:
-            page         = presentation["slides"][i]
-            title_id     = None
-            body_id      = None
-            body_element = None
-            has_table    = slide.table is not None
-
-            for element in page.get("pageElements", []):
-                if not isinstance(element, dict):
-                    continue
-                if "shape" in element:
-                    ph_type = safe_get(element, "shape", "placeholder", "type", default="")
-                    if ph_type == "TITLE":
-                        title_id = element["objectId"]
-                    elif ph_type in ("BODY", "OBJECT"):
-                        body_id      = element["objectId"]
-                        body_element = element
+            page_id   = f"slide_{i}"
+            title_id  = title_placeholder_id(i)
+            body_id   = body_placeholder_id(i)
+            has_table = slide.table is not None
 
             # Delete body placeholder on table slides → removes "Click to add text"
-            if has_table and body_id:
+            if has_table:
                 delete_requests.append({
                     "deleteObject": {"objectId": body_id}
                 })
-                body_id      = None
-                body_element = None
+                body_id = None
 
             # Resize body to left 50% on image slides
-            if use_images and slide.image_query and not has_table and body_element:
-                curr_w = safe_get(body_element, "size", "width", "magnitude", default=8229600)
-                curr_t = body_element.get("transform", {}) if isinstance(body_element, dict) else {}
-                if not isinstance(curr_w, (int, float)):
-                    curr_w = 8229600
+            if use_images and slide.image_query and not has_table:
+                curr_w      = deck["body_geometry"]["width"]
+                curr_t      = deck["body_geometry"]["transform"]
                 target_w    = int(SLIDE_WIDTH_EMU * 0.50)
                 new_scale_x = target_w / curr_w
 
@@ -350,11 +643,11 @@ def create_presentation(
                         "objectId": body_id,
                         "transform": {
                             "scaleX":     new_scale_x,
-                            "scaleY":     curr_t.get("scaleY", 1.0) if isinstance(curr_t, dict) else 1.0,
+                            "scaleY":     curr_t.get("scaleY", 1.0),
                             "shearX":     0,
                             "shearY":     0,
-                            "translateX": curr_t.get("translateX", 457200) if isinstance(curr_t, dict) else 457200,
-                            "translateY": curr_t.get("translateY", 1270000) if isinstance(curr_t, dict) else 1270000,
+                            "translateX": curr_t.get("translateX", 457200),
+                            "translateY": curr_t.get("translateY", 1270000),
                             "unit": "EMU"
                         },
                         "applyMode": "ABSOLUTE"
@@ -362,128 +655,437 @@ def create_presentation(
                 })
 
             # Title text
-            if title_id:
-                text_requests += [
-                    {"insertText": {"objectId": title_id, "text": slide.title}},
-                    {
-                        "updateTextStyle": {
-                            "objectId": title_id,
-                            "style": {
-                                "bold": True,
-                                "fontSize": {"magnitude": 24, "unit": "PT"},
-                                "foregroundColor": {
-                                    "opaqueColor": {"rgbColor": styles["title_color"]}
-                                },
-                            },
-                            "fields": "bold,fontSize,foregroundColor",
-                        }
-                    },
-                ]
+            text_requests.append({"insertText": {"objectId": title_id, "text": slide.title}})
+            if not baked_text:
+                text_requests.append(_title_style_request(title_id, styles["title_color"], 24))
 
             # Table slide
             if has_table:
-                print(f"  📊 Table added to slide {i}: {slide.title}")
-                table_requests += build_table_requests(
-                    page["objectId"],
+                slide_table_requests = build_table_requests(
+                    page_id,
                     slide.table,
                     slide_index=i,
                     header_color=styles["table_header_color"],
                     body_text_color=styles["table_body_text_color"],  # ← theme-aware
                 )
+                table_stats = request_stats(slide_table_requests)
+                print(f"  📊 Table added to slide {i}: {slide.title} "
+                      f"({table_stats['requests']} requests, {table_stats['bytes']} bytes)")
+                table_requests += slide_table_requests
 
             # Normal bullet slide
             else:
                 if body_id:
-                    bullet_text = "\n".join(f"• {b}" for b in slide.bullets)
-                    text_requests += [
-                        {"insertText": {"objectId": body_id, "text": bullet_text}},
-                        {
-                            "updateTextStyle": {
-                                "objectId": body_id,
-                                "style": {
-                                    "fontSize": {"magnitude": 14, "unit": "PT"},
-                                    "foregroundColor": {
-                                        "opaqueColor": {"rgbColor": styles["body_color"]}
-                                    },
-                                },
-                                "fields": "fontSize,foregroundColor",
-                            }
-                        },
-                    ]
-
-                # Per-slide image
-                if use_images and slide.image_query:
-                    img_url = find_image_url(slide.image_query)
-                    if img_url:
-                        img_w = 3800000
-                        img_h = 3200000
-                        image_requests.append({
-                            "createImage": {
-                                "objectId": f"slide_image_{i}",
-                                "url": img_url,
-                                "elementProperties": {
-                                    "pageObjectId": page["objectId"],
-                                    "size": {
-                                        "height": {"magnitude": img_h, "unit": "EMU"},
-                                        "width":  {"magnitude": img_w, "unit": "EMU"},
-                                    },
-                                    "transform": {
-                                        "scaleX": 1, "scaleY": 1,
-                                        "translateX": SLIDE_WIDTH_EMU - img_w - 150000,
-                                        "translateY": 1300000,
-                                        "unit": "EMU",
-                                    },
-                                },
-                            }
-                        })
-                        print(f"  🖼️  Slide {i}: '{slide.image_query}'")
-                    else:
-                        print(f"  ⚠️  No image for slide {i}: '{slide.image_query}'")
+                    text_requests.append({"insertText": {"objectId": body_id, "text": _bullet_text(slide)}})
+                    if not baked_text:
+                        text_requests.append(_body_style_request(body_id, styles["body_color"]))
 
             # Speaker notes
-            if slide.notes:
-                notes_page = safe_get(page, "slideProperties", "notesPage", default={})
-                if isinstance(notes_page, dict):
-                    for ne in notes_page.get("pageElements", []):
-                        if isinstance(ne, dict) and "shape" in ne:
-                            ne_ph = safe_get(ne, "shape", "placeholder", "type", default="")
-                            if ne_ph == "BODY":
-                                text_requests.append({
-                                    "insertText": {
-                                        "objectId": ne["objectId"],
-                                        "text": slide.notes,
-                                    }
-                                })
+            notes_id = deck["notes_ids"].get(page_id)
+            if slide.notes and notes_id:
+                text_requests.append({
+                    "insertText": {
+                        "objectId": notes_id,
+                        "text": slide.notes,
+                    }
+                })
 
         except Exception as e:
             print(f"  ❌ Error on slide {i}: {e}")
             traceback.print_exc()
             continue
 
-    # 7. Execute in correct order
-    all_requests = (
+    # Execute in correct order
+    return (
         background_requests +
         delete_requests +
         resize_requests +
         text_requests +
-        table_requests +
-        image_requests
+        table_requests
     )
-    if all_requests:
-        slides_service.presentations().batchUpdate(
+
+
+def _build_image_requests(outline, image_url, use_images, slide_image_urls) -> list:
+    """createImage requests for the hero and per-slide images; they go after
+    all other content."""
+    image_requests = []
+
+    # Hero image on title slide
+    if image_url.strip():
+        image_requests.append({
+            "createImage": {
+                "objectId": "hero_image_title",
+                "url": image_url.strip(),
+                "elementProperties": {
+                    "pageObjectId": "slide_0",
+                    "size": {
+                        "height": {"magnitude": HERO_H, "unit": "EMU"},
+                        "width":  {"magnitude": HERO_W, "unit": "EMU"},
+                    },
+                    "transform": {
+                        "scaleX": 1, "scaleY": 1,
+                        "translateX": HERO_X,
+                        "translateY": HERO_Y,
+                        "unit": "EMU",
+                    },
+                },
+            }
+        })
+
+    # Per-slide images
+    for i, slide in enumerate(outline.slides, start=1):
+        if use_images and slide.image_query and slide.table is None:
+            img_url = slide_image_urls.get(i)
+            if img_url:
+                image_requests.append(_slide_image_request(f"slide_image_{i}", f"slide_{i}", img_url))
+                print(f"  🖼️  Slide {i}: '{slide.image_query}'")
+            else:
+                print(f"  ⚠️  No image for slide {i}: '{slide.image_query}'")
+    return image_requests
+
+
+def populate_presentation(
+    slides_service,
+    deck: dict,
+    outline: PresentationOutline,
+    theme: str = "Default (No Theme)",
+    image_url: str = "",
+    use_images: bool = True,
+    image_workers: int = IMAGE_WORKERS,
+    image_urls: dict = None,
+    stats=None,
+    styles: dict = None,
+):
+    """Fill a provisioned deck with the outline's content.
+
+    Structural changes (default-slide deletion, missing or surplus slides)
+    and all content go out in a single batchUpdate. The exceptions are
+    speaker notes on slides created here, whose IDs must be fetched first,
+    and decks whose requests exceed BATCH_MAX_REQUESTS / BATCH_MAX_BYTES:
+    those are sent as ordered chunks, the non-image ones while image
+    lookups are still running.
+
+    `image_urls` may carry {image_query: url} results resolved ahead of
+    time; any query missing from it is looked up here.
+    """
+    styles          = styles or THEME_STYLES.get(theme, THEME_STYLES["Default (No Theme)"])
+    presentation_id = deck["presentation_id"]
+    num_slides      = len(outline.slides)
+
+    # 3. Reconcile slides with the outline
+    structure_requests = []
+    if deck["default_slide_id"]:
+        structure_requests.append({"deleteObject": {"objectId": deck["default_slide_id"]}})
+        deck["default_slide_id"] = None
+    have = deck["slide_count"]
+    if have is None:
+        structure_requests += _create_slide_requests(0, num_slides + 1)
+    elif num_slides > have:
+        structure_requests += _create_slide_requests(have + 1, num_slides - have)
+    elif num_slides < have:
+        for i in range(num_slides + 1, have + 1):
+            structure_requests.append({"deleteObject": {"objectId": f"slide_{i}"}})
+    deck["slide_count"] = num_slides
+
+    # Speaker notes IDs are only knowable once the slides exist
+    needs_notes = [i for i, s in enumerate(outline.slides, start=1) if s.notes]
+    if any(f"slide_{i}" not in deck["notes_ids"] for i in needs_notes):
+        if structure_requests:
+            _execute(
+                slides_service.presentations().batchUpdate(
+                    presentationId=presentation_id,
+                    body={"requests": structure_requests}
+                ),
+                stats, "slides.batchUpdate",
+            )
+            structure_requests = []
+        load_speaker_notes_ids(slides_service, deck, stats=stats)
+
+    # 4. Resolve per-slide images (and check the hero URL) in the background
+    image_queries = {}
+    if use_images:
+        for i, slide in enumerate(outline.slides, start=1):
+            if slide.image_query and slide.table is None:
+                image_queries[i] = slide.image_query
+    resolved = dict(image_urls or {})
+    missing  = [q for q in image_queries.values() if q not in resolved]
+    image_url = image_url.strip()
+    with ThreadPoolExecutor(max_workers=2) as lookup_pool:
+        lookups    = submit(lookup_pool, find_image_urls, missing, max_workers=image_workers)
+        hero_check = submit(lookup_pool, check_image_url, image_url) if image_url else None
+
+        # 5. Compile content. A deck too big for one batchUpdate starts
+        #    writing its chunks now, while the image lookups finish
+        with span("slides.assemble_requests") as assemble:
+            pending = structure_requests + _build_content_requests(deck, outline, styles, use_images)
+            assemble.set(**request_stats(pending))
+        content_chunks = chunk_requests(pending)
+        if len(content_chunks) > 1:
+            _send_chunks(slides_service, presentation_id, content_chunks, stats)
+            pending = []
+
+        resolved.update(lookups.result())
+        if hero_check is not None and not hero_check.result():
+            print(f"  ⚠️  Skipping hero image, Google would not be able to fetch it: {image_url}")
+            image_url = ""
+    slide_image_urls = {i: resolved.get(q) for i, q in image_queries.items()}
+
+    # 6. Images go last, with the rest of the content if it fit in one call
+    pending += _build_image_requests(outline, image_url, use_images, slide_image_urls)
+    if pending:
+        _send_chunks(slides_service, presentation_id, chunk_requests(pending), stats)
+
+
+def _send_chunks(slides_service, presentation_id: str, chunks: list, stats=None):
+    """Apply request chunks in order, one batchUpdate each."""
+    for n, chunk in enumerate(chunks, start=1):
+        if len(chunks) > 1:
+            print(f"📦 Sending batch {n}/{len(chunks)} ({len(chunk)} requests)")
+        _batch_update_with_image_fallback(slides_service, presentation_id, chunk, stats)
+
+
+def _batch_update_with_image_fallback(slides_service, presentation_id: str, requests: list, stats=None):
+    """Send `requests` as one batchUpdate. batchUpdate is atomic, so if
+    Google rejects it as invalid (HTTP 400) and it carries images, typically
+    one URL it couldn't fetch, nothing was applied: resend everything but
+    the images, then bisect the images so each bad one only loses itself
+    at a cost of a few calls rather than one per image. Any other error
+    (quota, auth, 5xx after retries) is raised as is."""
+    try:
+        _execute(
+            slides_service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={"requests": requests}
+            ),
+            stats, "slides.batchUpdate", requests=len(requests),
+        )
+        return
+    except Exception as e:
+        image_requests = [r for r in requests if "createImage" in r]
+        if not image_requests or http_status(e) != 400:
+            raise
+        print(f"⚠️  batchUpdate rejected ({type(e).__name__}), retrying with images bisected")
+
+    content_requests = [r for r in requests if "createImage" not in r]
+    if content_requests:   # an image-only chunk has nothing else to resend
+        _execute(
+            slides_service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={"requests": content_requests}
+            ),
+            stats, "slides.batchUpdate", requests=len(content_requests), image_fallback=True,
+        )
+    # The images together were just rejected, so start from the two halves
+    if len(image_requests) == 1:
+        _skip_image(image_requests[0], "rejected")
+        inserted = 0
+    else:
+        middle   = len(image_requests) // 2
+        inserted = (_insert_images(slides_service, presentation_id, image_requests[:middle], stats)
+                    + _insert_images(slides_service, presentation_id, image_requests[middle:], stats))
+    print(f"🖼️  Inserted {inserted} of {len(image_requests)} images after the rejected batch")
+
+
+def _insert_images(slides_service, presentation_id: str, image_requests: list, stats=None) -> int:
+    """Insert `image_requests` in one batchUpdate, splitting in half on a
+    400 until the bad images are isolated. Returns how many went in."""
+    try:
+        _execute(
+            slides_service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={"requests": image_requests}
+            ),
+            stats, "slides.batchUpdate", requests=len(image_requests), image_fallback=True,
+        )
+        return len(image_requests)
+    except Exception as e:
+        if http_status(e) != 400:
+            raise
+        if len(image_requests) == 1:
+            _skip_image(image_requests[0], type(e).__name__)
+            return 0
+    middle = len(image_requests) // 2
+    return (_insert_images(slides_service, presentation_id, image_requests[:middle], stats)
+            + _insert_images(slides_service, presentation_id, image_requests[middle:], stats))
+
+
+def _skip_image(request: dict, reason: str):
+    image = request["createImage"]
+    print(f"  ⚠️  Image {image['objectId']} skipped: {reason}")
+    forget_image_url(image["url"])   # its cache entry is re-validated on the next lookup
+
+
+# ── Single-slide patching ─────────────────────────────────────────────────────
+def presentation_id_from_link(link: str) -> str:
+    return link.split("/presentation/d/", 1)[1].split("/", 1)[0]
+
+
+def _slide_elements(slides_service, presentation_id: str, slide_index: int, stats=None) -> dict:
+    """Current object IDs on content slide `slide_index`, by role, from a
+    field-masked pages().get of that one slide."""
+    page = _execute(
+        slides_service.presentations().pages().get(
             presentationId=presentation_id,
-            body={"requests": all_requests}
-        ).execute()
+            pageObjectId=f"slide_{slide_index}",
+            fields="pageElements(objectId,size,transform),"
+                   "slideProperties.notesPage.notesProperties.speakerNotesObjectId",
+        ),
+        stats, "slides.pages.get",
+    )
+    # Elements replaced by earlier patches carry a random suffix after the base ID
+    prefixes = {
+        "title": title_placeholder_id(slide_index),
+        "body":  body_placeholder_id(slide_index),
+        "image": f"slide_image_{slide_index}",
+        "table": f"table_{slide_index}",
+    }
+    elements = {role: None for role in prefixes}
+    for element in page.get("pageElements", []):
+        object_id = element["objectId"]
+        for role, prefix in prefixes.items():
+            if object_id == prefix or object_id.startswith(prefix + "_"):
+                elements[role] = element
+    elements["notes_id"] = safe_get(page, "slideProperties", "notesPage", "notesProperties", "speakerNotesObjectId")
+    return elements
 
-    # 8. Share publicly
-    drive_service.permissions().create(
-        fileId=presentation_id,
-        body={"role": "reader", "type": "anyone"}
-    ).execute()
 
-    link = f"https://docs.google.com/presentation/d/{presentation_id}/edit"
-    print(f"\n✅ Presentation link: {link}")
-    return link
+def _patch_requests(elements: dict, slide_index: int, old: SlideContent, new: SlideContent, styles: dict,
+                    image_url: str = None) -> tuple[list, list]:
+    """Smallest request list that turns `old` into `new` on an existing
+    slide, plus the names of the parts that changed."""
+    page_id   = f"slide_{slide_index}"
+    suffix    = secrets.token_hex(3)
+    requests  = []
+    changes   = []
+    new_table = new.table is not None
+
+    # Title
+    if new.title != old.title:
+        title_id = title_placeholder_id(slide_index)
+        if old.title:
+            requests.append({"deleteText": {"objectId": title_id, "textRange": {"type": "ALL"}}})
+        requests.append({"insertText": {"objectId": title_id, "text": new.title}})
+        requests.append(_title_style_request(title_id, styles["title_color"], 24))
+        changes.append("title")
+
+    # Table, replacing the body on table slides
+    table = elements["table"]
+    if table and (not new_table or new.table != old.table):
+        requests.append({"deleteObject": {"objectId": table["objectId"]}})
+        table = None
+        if not new_table:
+            changes.append("table")
+    if new_table and table is None:
+        if elements["body"]:
+            requests.append({"deleteObject": {"objectId": elements["body"]["objectId"]}})
+        requests += build_table_requests(
+            page_id, new.table, slide_index,
+            styles["table_header_color"], styles["table_body_text_color"],
+            table_id=f"table_{slide_index}_{suffix}",
+        )
+        changes.append("table")
+
+    # Image on the right half of bullet slides
+    had_image = elements["image"] is not None
+    has_image = had_image
+    stale     = new_table or not new.image_query or new.image_query != old.image_query
+    if had_image and stale:
+        requests.append({"deleteObject": {"objectId": elements["image"]["objectId"]}})
+        has_image = False
+    if not new_table and not has_image and image_url:
+        requests.append(_slide_image_request(f"slide_image_{slide_index}_{suffix}", page_id, image_url))
+        has_image = True
+    if (had_image and stale) or (has_image and not had_image):
+        changes.append("image")
+
+    # Bullets
+    if not new_table:
+        body     = elements["body"]
+        target_w = int(SLIDE_WIDTH_EMU * 0.50) if has_image else 8229600
+        if body is None:
+            # The placeholder was deleted when this was a table slide
+            body_id = f"{body_placeholder_id(slide_index)}_{suffix}"
+            requests.append({
+                "createShape": {
+                    "objectId": body_id,
+                    "shapeType": "TEXT_BOX",
+                    "elementProperties": {
+                        "pageObjectId": page_id,
+                        "size": {
+                            "height": {"magnitude": 4500000, "unit": "EMU"},
+                            "width":  {"magnitude": target_w, "unit": "EMU"},
+                        },
+                        "transform": {"scaleX": 1, "scaleY": 1, "translateX": 457200,
+                                      "translateY": 1270000, "unit": "EMU"},
+                    },
+                }
+            })
+        else:
+            body_id = body["objectId"]
+            if had_image != has_image:
+                width     = safe_get(body, "size", "width", "magnitude") or 8229600
+                transform = body.get("transform", {})
+                requests.append({
+                    "updatePageElementTransform": {
+                        "objectId": body_id,
+                        "transform": {
+                            "scaleX":     target_w / width,
+                            "scaleY":     transform.get("scaleY", 1.0),
+                            "shearX":     0,
+                            "shearY":     0,
+                            "translateX": transform.get("translateX", 457200),
+                            "translateY": transform.get("translateY", 1270000),
+                            "unit": "EMU",
+                        },
+                        "applyMode": "ABSOLUTE",
+                    }
+                })
+        if body is None or new.bullets != old.bullets or old.table is not None:
+            if body is not None and old.bullets and old.table is None:
+                requests.append({"deleteText": {"objectId": body_id, "textRange": {"type": "ALL"}}})
+            requests.append({"insertText": {"objectId": body_id, "text": _bullet_text(new)}})
+            requests.append(_body_style_request(body_id, styles["body_color"]))
+            changes.append("bullets")
+
+    # Speaker notes
+    notes_id = elements["notes_id"]
+    if new.notes != old.notes and notes_id:
+        if old.notes:
+            requests.append({"deleteText": {"objectId": notes_id, "textRange": {"type": "ALL"}}})
+        if new.notes:
+            requests.append({"insertText": {"objectId": notes_id, "text": new.notes}})
+        changes.append("notes")
+
+    return requests, changes
+
+
+def patch_slide(
+    slides_service,
+    presentation_id: str,
+    slide_index: int,
+    old: SlideContent,
+    new: SlideContent,
+    theme: str = "Default (No Theme)",
+    use_images: bool = True,
+    stats=None,
+    styles: dict = None,
+) -> list:
+    """Update content slide `slide_index` (1-based) of an existing deck from
+    `old` to `new` in place: one masked pages().get and at most one
+    batchUpdate touching only what changed. Returns the changed parts."""
+    styles   = styles or THEME_STYLES.get(theme, THEME_STYLES["Default (No Theme)"])
+    elements = _slide_elements(slides_service, presentation_id, slide_index, stats=stats)
+
+    image_url = None
+    wants_image = use_images and new.image_query and new.table is None
+    if wants_image and (elements["image"] is None or new.image_query != old.image_query):
+        image_url = find_image_url(new.image_query)
+
+    requests, changes = _patch_requests(elements, slide_index, old, new, styles, image_url)
+    if requests:
+        _batch_update_with_image_fallback(slides_service, presentation_id, requests, stats)
+    print(f"🔁 Slide {slide_index} patched: {', '.join(changes) or 'no changes'} ({len(requests)} requests)")
+    return changes
 
 
 if __name__ == "__main__":
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from atomic_file import write_atomic
+
+
+def test_write_atomic_creates_directory_and_replaces(tmp_path):
+    path = tmp_path / "nested" / "state.json"
+    write_atomic(str(path), "one")
+    write_atomic(str(path), "two")
+    assert path.read_text(encoding="utf-8") == "two"
+    assert os.listdir(path.parent) == ["state.json"]
+
+
+def test_write_atomic_removes_temp_file_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    path.write_text("old", encoding="utf-8")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        write_atomic(str(path), "new")
+    assert path.read_text(encoding="utf-8") == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
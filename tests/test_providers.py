@@ -0,0 +1,40 @@
+import threading
+
+import providers
+
+
+def _get_within(name: str, timeout: float = 5.0):
+    """providers.get(name) on a daemon thread, failing instead of hanging."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=providers.get(name)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"providers.get({name!r}) did not return within {timeout}s"
+    return result["value"]
+
+
+def test_google_builds_from_cold_registry():
+    providers.reset("google")
+    providers.reset("credentials")
+    service_provider = _get_within("google")
+    assert service_provider.store is _get_within("credentials")
+
+
+def test_factory_may_use_another_provider():
+    providers.register("test.inner", lambda: "inner")
+    providers.register("test.outer", lambda: ("outer", providers.get("test.inner")))
+    assert _get_within("test.outer") == ("outer", "inner")
+
+
+def test_slow_factory_does_not_block_other_providers():
+    release = threading.Event()
+    providers.register("test.slow", lambda: release.wait(5) and "slow")
+    providers.register("test.fast", lambda: "fast")
+    slow = threading.Thread(target=providers.get, args=("test.slow",), daemon=True)
+    slow.start()
+    try:
+        assert _get_within("test.fast", timeout=1.0) == "fast"
+    finally:
+        release.set()
+        slow.join(5)
+    assert providers.get("test.slow") == "slow"
@@ -0,0 +1,167 @@
+"""Per-theme template decks.
+
+A template is a presentation whose master and layouts already carry a
+theme's background and title/body text styles. New decks start as a Drive
+copy of it, so per-slide background and text-style requests are no longer
+needed. Templates are created on first use and their IDs recorded in
+THEME_TEMPLATES_PATH, per Google account since one account can't copy
+another's private deck; run this module to create them all ahead of time.
+"""
+import hashlib
+import json
+import os
+import threading
+from atomic_file import write_atomic
+from google_scheduler import DEFAULT_USER, as_user, current_user
+
+THEME_TEMPLATES_PATH = os.getenv("THEME_TEMPLATES_PATH", os.path.join(".cache", "theme_templates.json"))
+USE_THEME_TEMPLATES  = os.getenv("USE_THEME_TEMPLATES", "1").lower() not in ("0", "false", "no", "off")
+
+# Text styles baked into the layout placeholders; they match what
+# slides_generator applies per slide when no template is used
+TITLE_STYLE   = {"bold": True, "fontSize": 38}   # TITLE layout, CENTERED_TITLE
+HEADING_STYLE = {"bold": True, "fontSize": 24}   # TITLE_AND_BODY layout, TITLE
+BODY_STYLE    = {"fontSize": 14}                 # TITLE_AND_BODY layout, BODY
+
+
+def styles_key(styles: dict) -> str:
+    """Stable ID for a THEME_STYLES entry; editing a theme yields a new template."""
+    return hashlib.sha256(json.dumps(styles, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def template_key(styles: dict, user: str = None) -> str:
+    """TemplateStore key for `styles` owned by `user` (default: the current
+    Google account). The default account keeps the bare styles key, so
+    templates recorded before per-user keys stay valid."""
+    user = user or current_user()
+    key  = styles_key(styles)
+    return key if user == DEFAULT_USER else f"{user}:{key}"
+
+
+def _text_style_request(object_id: str, style: dict, color: dict) -> dict:
+    text_style = {
+        "fontSize": {"magnitude": style["fontSize"], "unit": "PT"},
+        "foregroundColor": {"opaqueColor": {"rgbColor": color}},
+    }
+    fields = "fontSize,foregroundColor"
+    if "bold" in style:
+        text_style["bold"] = style["bold"]
+        fields = "bold," + fields
+    return {"updateTextStyle": {"objectId": object_id, "style": text_style, "fields": fields}}
+
+
+def _background_request(page_id: str, color: dict) -> dict:
+    return {
+        "updatePageProperties": {
+            "objectId": page_id,
+            "pageProperties": {"pageBackgroundFill": {"solidFill": {"color": {"rgbColor": color}}}},
+            "fields": "pageBackgroundFill.solidFill.color",
+        }
+    }
+
+
+def _placeholder_ids(layout: dict) -> dict:
+    ids = {}
+    for element in layout.get("pageElements", []):
+        ph_type = (element.get("shape", {}).get("placeholder") or {}).get("type")
+        if ph_type and ph_type not in ids:
+            ids[ph_type] = element["objectId"]
+    return ids
+
+
+def template_requests(presentation: dict, styles: dict) -> tuple[list, list]:
+    """Requests that bake `styles` into a fresh presentation's master and
+    layouts, plus the list of styles that ended up baked ("background",
+    "text") so decks copied from it know what they can skip."""
+    requests, baked = [], []
+    layouts = {
+        (layout.get("layoutProperties") or {}).get("name"): layout
+        for layout in presentation.get("layouts", [])
+    }
+
+    if styles.get("background_color"):
+        # Slides inherit the background from their layout, layouts from the master
+        pages = [m["objectId"] for m in presentation.get("masters", [])]
+        pages += [layouts[name]["objectId"] for name in ("TITLE", "TITLE_AND_BODY") if name in layouts]
+        requests += [_background_request(page_id, styles["background_color"]) for page_id in pages]
+        if pages:
+            baked.append("background")
+
+    title_ids = _placeholder_ids(layouts.get("TITLE", {}))
+    body_ids  = _placeholder_ids(layouts.get("TITLE_AND_BODY", {}))
+    targets = [
+        (title_ids.get("CENTERED_TITLE"), TITLE_STYLE,   styles["title_color"]),
+        (body_ids.get("TITLE"),           HEADING_STYLE, styles["title_color"]),
+        (body_ids.get("BODY"),            BODY_STYLE,    styles["body_color"]),
+    ]
+    if all(object_id for object_id, _, _ in targets):
+        requests += [_text_style_request(object_id, style, color) for object_id, style, color in targets]
+        baked.append("text")
+    return requests, baked
+
+
+class TemplateStore:
+    """JSON file of {template_key: template record}, written atomically."""
+
+    def __init__(self, path: str = THEME_TEMPLATES_PATH):
+        self.path    = path
+        self._lock   = threading.Lock()
+        self._create = {}   # template_key -> lock held while that template is being created
+        self._failed = set()   # template_keys whose creation failed in this process
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, records: dict):
+        write_atomic(self.path, json.dumps(records, indent=2))
+
+    def get(self, key: str):
+        with self._lock:
+            return self._read().get(key)
+
+    def set(self, key: str, record: dict):
+        with self._lock:
+            records = self._read()
+            records[key] = record
+            self._write(records)
+
+    def drop(self, key: str):
+        with self._lock:
+            records = self._read()
+            if records.pop(key, None) is not None:
+                self._write(records)
+
+    def mark_failed(self, key: str):
+        """Stop templating `key` for the rest of the process."""
+        with self._lock:
+            self._failed.add(key)
+
+    def failed(self, key: str) -> bool:
+        with self._lock:
+            return key in self._failed
+
+    def creation_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._create.setdefault(key, threading.Lock())
+
+
+template_store = TemplateStore()
+
+
+if __name__ == "__main__":
+    import argparse
+    from google_auth import get_services
+    from slides_generator import THEME_STYLES, ensure_theme_template
+    parser = argparse.ArgumentParser(description="Create the theme template decks for a Google account.")
+    parser.add_argument("--user", default=DEFAULT_USER, help="account key the templates belong to")
+    args = parser.parse_args()
+    with as_user(args.user):
+        slides_service, drive_service = get_services()
+        templates = {name: ensure_theme_template(slides_service, styles, name=name, drive_service=drive_service)
+                     for name, styles in THEME_STYLES.items()}
+    for name, template in templates.items():
+        print(f"🎨 {name}: {template['presentation_id']} (baked: {', '.join(template['baked_styles']) or 'nothing'})")
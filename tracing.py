@@ -0,0 +1,185 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_EXPORT_DIR = os.getenv("TRACE_EXPORT_DIR", "")
+OTLP_ENDPOINT    = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+SERVICE_NAME     = "ai-ppt-maker"
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span  = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.name       = name
+        self.trace_id   = trace_id
+        self.span_id    = secrets.token_hex(8)
+        self.parent_id  = parent_id
+        self.attributes = dict(attributes or {})
+        self.start      = time.time()
+        self.end        = None
+        self.status     = "ok"
+        self.error      = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "name":       self.name,
+            "trace_id":   self.trace_id,
+            "span_id":    self.span_id,
+            "parent_id":  self.parent_id,
+            "start":      self.start,
+            "duration_s": round(self.duration, 4),
+            "status":     self.status,
+            "error":      self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """All spans recorded during one generation."""
+
+    def __init__(self, name: str):
+        self.name     = name
+        self.trace_id = secrets.token_hex(16)
+        self.spans    = []
+        self._lock    = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict:
+        """{span name: {count, total_s, max_s}} in first-seen order."""
+        summary = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            entry = summary.setdefault(span.name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "errors": 0})
+            entry["count"]   += 1
+            entry["total_s"] += span.duration
+            entry["max_s"]    = max(entry["max_s"], span.duration)
+            entry["errors"]  += span.status == "error"
+        for entry in summary.values():
+            entry["total_s"] = round(entry["total_s"], 3)
+            entry["max_s"]   = round(entry["max_s"], 3)
+        return summary
+
+    def to_dicts(self) -> list[dict]:
+        with self._lock:
+            return [span.to_dict() for span in self.spans]
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"trace_id": self.trace_id, "name": self.name, "spans": self.to_dicts()}, f, indent=2)
+
+    def to_otlp(self) -> dict:
+        """The trace as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        with self._lock:
+            spans = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [{
+                    "traceId":           span.trace_id,
+                    "spanId":            span.span_id,
+                    "parentSpanId":      span.parent_id or "",
+                    "name":              span.name,
+                    "kind":              1,
+                    "startTimeUnixNano": str(int(span.start * 1e9)),
+                    "endTimeUnixNano":   str(int((span.end or time.time()) * 1e9)),
+                    "attributes":        [attribute(k, v) for k, v in span.attributes.items() if v is not None],
+                    "status":            {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export_otlp(self, endpoint: str = OTLP_ENDPOINT):
+        import requests
+        url = endpoint.rstrip("/")
+        if not url.endswith("/v1/traces"):
+            url += "/v1/traces"
+        response = requests.post(url, json=self.to_otlp(), timeout=5)
+        response.raise_for_status()
+
+    def export(self):
+        """Export to TRACE_EXPORT_DIR and/or the OTLP endpoint, if configured."""
+        try:
+            if TRACE_EXPORT_DIR:
+                os.makedirs(TRACE_EXPORT_DIR, exist_ok=True)
+                self.export_json(os.path.join(TRACE_EXPORT_DIR, f"{int(time.time())}-{self.trace_id[:8]}.json"))
+            if OTLP_ENDPOINT:
+                self.export_otlp(OTLP_ENDPOINT)
+        except Exception as e:
+            print(f"⚠️  Trace export failed: {e}")
+
+
+@contextmanager
+def trace(name: str = "generation"):
+    """Collect every span opened inside the block (including on threads
+    started through `submit`) into one Trace, exported on exit."""
+    current = Trace(name)
+    trace_token = _current_trace.set(current)
+    try:
+        with span(name):
+            yield current
+    finally:
+        _current_trace.reset(trace_token)
+        current.export()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the block as a named span. Outside a trace this is a no-op
+    apart from handing back a Span that accepts attributes."""
+    current = _current_trace.get()
+    parent  = _current_span.get()
+    item    = Span(
+        name,
+        trace_id=current.trace_id if current else "",
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    token = _current_span.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.status = "error"
+        item.error  = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        item.end = time.time()
+        _current_span.reset(token)
+        if current is not None:
+            current.add(item)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit that carries the caller's trace context to the worker thread."""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)